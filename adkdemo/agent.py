@@ -4,9 +4,13 @@ from google.adk.agents import Agent
 from dotenv import load_dotenv
 import os
 import json
+import threading
 import mysql.connector
 from mysql.connector import Error
 from pydantic import BaseModel, Field
+from concurrent.futures import ThreadPoolExecutor
+from src.metrics import metrics, estimate_bytes
+from src.readonly import is_read_only, read_only_transaction
 
 load_dotenv()
 
@@ -28,6 +32,10 @@ class MySQLHandler:
     def __init__(self, config: MySQLConfig):
         self.config = config
         self.connection = None
+        # 批量并发查询使用的连接池，首次使用时创建
+        self.pool = None
+        self.pool_size = int(os.getenv("MYSQL_POOL_SIZE", 8))
+        self._pool_lock = threading.Lock()
 
     def connect(self):
         """建立数据库连接"""
@@ -40,6 +48,7 @@ class MySQLHandler:
                 database=self.config.database,
                 charset="utf8mb4"
             )
+            metrics.inc("db_connections_opened_total", source="adkdemo")
             if self.connection.is_connected():
                 return True
         except Error as e:
@@ -55,15 +64,68 @@ class MySQLHandler:
         """执行查询并返回结果"""
         result = []
         try:
-            cursor = self.connection.cursor(dictionary=True)
-            cursor.execute(query, params or ())
-            result = cursor.fetchall()
-            cursor.close()
+            with metrics.timer("db_query", source="adkdemo"):
+                cursor = self.connection.cursor(dictionary=True)
+                cursor.execute(query, params or ())
+                result = cursor.fetchall()
+                cursor.close()
+            metrics.inc("db_round_trips_total", source="adkdemo")
+            metrics.inc("db_rows_returned_total", len(result), source="adkdemo")
+            metrics.inc("db_bytes_returned_total", estimate_bytes(result), source="adkdemo")
             return result
         except Error as e:
             print(f"查询执行失败: {e}")
             return []
 
+    def get_pooled_connection(self):
+        """从连接池获取连接，使用完调用 close() 归还"""
+        with self._pool_lock:
+            if self.pool is None:
+                self._create_pool()
+        return self.pool.get_connection()
+
+    def _create_pool(self):
+        """创建连接池（调用方持有 _pool_lock）"""
+        from mysql.connector import pooling
+        self.pool = pooling.MySQLConnectionPool(
+            pool_name="adkdemo",
+            pool_size=self.pool_size,
+            host=self.config.host,
+            port=self.config.port,
+            user=self.config.user,
+            password=self.config.password,
+            database=self.config.database,
+            charset="utf8mb4",
+        )
+        metrics.inc("db_connections_opened_total", self.pool_size, source="adkdemo")
+
+    def execute_limited(self, query: str, max_rows: int = 1000, timeout: float = 30) -> dict:
+        """在池化连接上执行单条只读查询，最多返回 max_rows 行，超过 timeout 秒由 MySQL 终止"""
+        if not is_read_only(query):
+            return {"query": query, "error": "只允许单条只读语句"}
+        try:
+            connection = self.get_pooled_connection()
+            try:
+                with metrics.timer("db_query", source="adkdemo"), read_only_transaction(connection):
+                    cursor = connection.cursor(dictionary=True)
+                    cursor.execute("SET SESSION max_execution_time = %s", (int(timeout * 1000),))
+                    cursor.execute(query)
+                    rows = cursor.fetchmany(max_rows + 1)
+                    truncated = len(rows) > max_rows
+                    if truncated:
+                        connection.consume_results()
+                    cursor.close()
+            finally:
+                connection.close()
+        except Error as e:
+            print(f"查询执行失败: {e}")
+            return {"query": query, "error": str(e)}
+        rows = rows[:max_rows]
+        metrics.inc("db_round_trips_total", source="adkdemo")
+        metrics.inc("db_rows_returned_total", len(rows), source="adkdemo")
+        metrics.inc("db_bytes_returned_total", estimate_bytes(rows), source="adkdemo")
+        return {"query": query, "rows": rows, "truncated": truncated}
+
     def get_tables(self) -> list:
         """获取数据库中所有表名"""
         query = """
@@ -130,6 +192,32 @@ class MySQLToolkit:
         """执行SQL查询并返回结果"""
         return self.db_handler.execute_query(query, params)
 
+    def execute_many(self, queries: list[str], max_rows: int = 1000, timeout: float = 30) -> list:
+        """并发执行多条互不依赖的只读查询（SELECT/SHOW/DESCRIBE/EXPLAIN/WITH），一次返回全部结果；
+        每条最多返回 max_rows 行、最长执行 timeout 秒，单条失败不影响其他语句"""
+        if not queries:
+            return []
+        workers = min(len(queries), self.db_handler.pool_size)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="execute-many") as executor:
+            return list(executor.map(lambda q: self.db_handler.execute_limited(q, max_rows, timeout), queries))
+
+    def export_query(self, query: str, format: str = "parquet") -> dict:
+        """把只读查询的结果分批写入本地 Parquet/CSV 文件，只返回文件路径、行数和字段类型，适合导出大量数据"""
+        from src.export import export_query
+        if not is_read_only(query):
+            return {"error": "只允许导出单条只读查询"}
+        try:
+            # 流式读取会长时间占用连接，单独从连接池取一个，避免和其他工具共用同一连接
+            connection = self.db_handler.get_pooled_connection()
+            try:
+                with read_only_transaction(connection):
+                    return export_query(connection, query, fmt=format)
+            finally:
+                connection.close()
+        except (Error, ValueError, ImportError) as e:
+            print(f"导出失败: {e}")
+            return {"error": str(e)}
+
     def get_table_detail(self, table_name: str, sort_by: str = "create_time", sort_method: str = "desc", limit: int = 10) -> dict:
         """获取指定表的完整信息（结构、注释、数据量、前N行数据）"""
         return {
@@ -157,6 +245,8 @@ class MySQLAIAgent:
         3. 可以根据用户需求生成SQL语句,调用execute_query工具执行返回结果并分析
         4. 回答时要清晰、结构化，使用中文，数据展示要易读
         5. 如果工具调用失败或无数据，要友好提示
+        6. 需要多条互不依赖的统计结果时，调用execute_many工具一次并发执行，减少工具调用次数
+        7. 当用户需要大量明细数据（如某个视频的全部评论）时，调用export_query工具导出到文件，只向用户说明文件路径、行数和字段
         """
 
 
@@ -185,5 +275,5 @@ root_agent = Agent(
     instruction=(
         agent._get_system_prompt()
     ),
-    tools=[agent.db_toolkit.get_all_table_info, agent.db_toolkit.get_table_detail, agent.db_toolkit.execute_query],
+    tools=[agent.db_toolkit.get_all_table_info, agent.db_toolkit.get_table_detail, agent.db_toolkit.execute_query, agent.db_toolkit.execute_many, agent.db_toolkit.export_query],
 )
@@ -1,5 +1,6 @@
 # ./adk_agent_samples/mcp_client_agent/agent.py
 import os
+import sys
 from google.adk.models.lite_llm import LiteLlm
 from google.adk.agents import Agent
 from google.adk.tools.mcp_tool import McpToolset
@@ -28,8 +29,9 @@ root_agent = Agent(
         McpToolset(
             connection_params=StdioConnectionParams(
                 server_params = StdioServerParameters(
-                    command='uv',
-                    args=["run", PATH_TO_YOUR_MCP_SERVER_SCRIPT]
+                    # 直接用当前解释器启动，省去每次 spawn 时 `uv run` 的环境解析开销
+                    command=sys.executable,
+                    args=[PATH_TO_YOUR_MCP_SERVER_SCRIPT]
                 )
             )
             # tool_filter=['load_web_page'] # Optional: ensure only specific tools are loaded
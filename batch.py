@@ -0,0 +1,116 @@
+# 批量问题运行器：从 JSONL 读取问题，并发交给 Agent 处理，答案和耗时写入 JSONL
+#
+# 输入每行一个问题，例如：
+#   {"id": "q1", "question": "最近一周新增了多少条评论？"}
+#   "各平台的视频点赞总数是多少？"
+# 用法：
+#   uv run batch.py questions.jsonl -o answers.jsonl --concurrency 8 --db-concurrency 4 --rps 2
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from main import agent, sql_tools
+from src.metrics import metrics
+
+
+class RateLimiter:
+    """限制每秒发起的请求数"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self._lock = asyncio.Lock()
+        self._next = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def load_questions(path: str) -> list:
+    """读取问题文件，支持对象行（id/question）或纯字符串行；格式不对的行抛出带行号的 ValueError"""
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for index, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path} 第 {index} 行不是合法的 JSON: {e}") from None
+            if isinstance(item, str):
+                item = {"question": item}
+            if not isinstance(item, dict) or not isinstance(item.get("question"), str) or not item["question"].strip():
+                raise ValueError(f"{path} 第 {index} 行缺少 question 字段")
+            item.setdefault("id", str(index))
+            questions.append(item)
+    return questions
+
+
+async def ask(item: dict, llm_slots: asyncio.Semaphore, limiter: RateLimiter) -> dict:
+    """处理单个问题，返回答案、耗时和token用量"""
+    async with llm_slots:
+        await limiter.wait()
+        start = time.perf_counter()
+        record = {"id": item["id"], "question": item["question"]}
+        with metrics.turn(item["id"]):
+            try:
+                resp = await agent.run(item["question"])
+                usage = resp.usage()
+                record.update(answer=resp.output, input_tokens=usage.input_tokens, output_tokens=usage.output_tokens)
+                metrics.record_llm_usage(usage.input_tokens, usage.output_tokens, time.perf_counter() - start, model="deepseek-chat")
+            except Exception as e:
+                record.update(answer=None, error=f"{type(e).__name__}: {e}")
+        record["elapsed_s"] = round(time.perf_counter() - start, 3)
+        return record
+
+
+async def run_batch(questions: list, output: str, concurrency: int, rps: float):
+    llm_slots = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rps)
+    start = time.perf_counter()
+    failed = 0
+    with open(output, "w", encoding="utf-8") as f:
+        # 按完成顺序写出，中途中断也能保留已完成的答案
+        for done in asyncio.as_completed([ask(item, llm_slots, limiter) for item in questions]):
+            record = await done
+            failed += 1 if record.get("error") else 0
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            print(f"[{record['id']}] {record['elapsed_s']}s {'失败' if record.get('error') else '完成'}")
+    print(f"共 {len(questions)} 个问题，失败 {failed} 个，总耗时 {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量问题运行器")
+    parser.add_argument("questions", help="问题 JSONL 文件")
+    parser.add_argument("-o", "--output", default="answers.jsonl", help="答案输出 JSONL 文件")
+    parser.add_argument("--concurrency", type=int, default=8, help="同时进行的 Agent 对话数")
+    parser.add_argument("--db-concurrency", type=int, default=4, help="同时执行的数据库查询数")
+    parser.add_argument("--rps", type=float, default=0, help="每秒最多发起的问题数，0 表示不限制")
+    args = parser.parse_args()
+
+    sql_tools.db_slots = threading.BoundedSemaphore(args.db_concurrency)
+    try:
+        questions = load_questions(args.questions)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        asyncio.run(run_batch(questions, args.output, args.concurrency, args.rps))
+    except KeyboardInterrupt:
+        sql_tools.cancel_all()
+        raise
+    finally:
+        metrics.dump(".logs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# startup.py - 冷启动耗时基准
+#
+# 用法:
+#   uv run bench/startup.py                        # import 耗时 + MCP server 首次响应耗时
+#   uv run bench/startup.py --tool get_tables      # 额外测量首次工具调用(需要数据库)
+#   uv run bench/startup.py --budget-ms 1500       # 超出预算时以非0退出码结束
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_SCRIPT = os.path.join(ROOT, "mcp", "server.py")
+
+# 需要统计 import 耗时的入口模块
+MODULES = ["src.sql_tools", "src.sql_agent"]
+
+
+def import_time(module: str, top: int = 10) -> dict:
+    """使用 -X importtime 统计模块的导入耗时，返回总耗时和累计耗时最高的依赖"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = int(parts[0]), int(parts[1]), parts[2]
+        # 缩进表示嵌套层级，只有顶层条目参与总耗时
+        entries.append((name.strip(), self_us, cumulative_us, len(name) - len(name.lstrip())))
+    total_us = sum(cumulative for _, _, cumulative, depth in entries if depth == 1)
+    heaviest = sorted(entries, key=lambda e: e[2], reverse=True)[:top]
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "total_ms": total_us / 1000,
+        "heaviest": [(name, cumulative / 1000) for name, _, cumulative, _ in heaviest],
+    }
+
+
+async def mcp_first_response(tool: str = None, tool_args: dict = None) -> dict:
+    """测量 MCP server 从进程启动到 initialize / list_tools / 首次工具调用返回的耗时"""
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(command=sys.executable, args=[SERVER_SCRIPT], cwd=ROOT)
+    timings = {}
+    start = time.perf_counter()
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            timings["initialize_ms"] = (time.perf_counter() - start) * 1000
+            await session.list_tools()
+            timings["list_tools_ms"] = (time.perf_counter() - start) * 1000
+            if tool:
+                await session.call_tool(tool, tool_args or {})
+                timings["first_tool_ms"] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动耗时基准")
+    parser.add_argument("--tool", help="首次调用的工具名，如 get_tables（需要可用的数据库）")
+    parser.add_argument("--top", type=int, default=10, help="展示累计耗时最高的前N个依赖")
+    parser.add_argument("--budget-ms", type=float, help="进程启动到首次响应的耗时预算")
+    parser.add_argument("--skip-mcp", action="store_true", help="只统计 import 耗时")
+    args = parser.parse_args()
+
+    for module in MODULES:
+        report = import_time(module, args.top)
+        status = "" if report["ok"] else " (导入失败)"
+        print(f"[import] {module}: {report['total_ms']:.1f} ms{status}")
+        for name, cumulative_ms in report["heaviest"]:
+            print(f"    {cumulative_ms:10.1f} ms  {name}")
+
+    if args.skip_mcp:
+        return
+
+    timings = asyncio.run(mcp_first_response(args.tool))
+    for name, value in timings.items():
+        print(f"[mcp] {name}: {value:.1f} ms")
+
+    first_response_ms = timings.get("first_tool_ms", timings["list_tools_ms"])
+    if args.budget_ms is not None and first_response_ms > args.budget_ms:
+        print(f"超出启动预算: {first_response_ms:.1f} ms > {args.budget_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
 
-from src.sql_agent import SQLAgent
 from src.sql_tools import SQLTools
+from src.metrics import metrics
 from pydantic_ai import Agent
 from pydantic_ai.models.openai import OpenAIChatModel
 from pydantic_ai.providers.deepseek import DeepSeekProvider
 
 from dotenv import load_dotenv
 import os
+import time
 import asyncio
 load_dotenv()
 
@@ -28,13 +29,27 @@ def main():
     # result = agent.process_query("查询所有评论")
     # print(result)
     history = []
+    turn = 0
     while True:
         user_input = input("请输入您的查询（输入exit退出）：")
         if user_input.lower() == 'exit':
             break
-        resp = agent.run_sync(user_prompt=user_input, message_history=history)
+        turn += 1
+        try:
+            with metrics.turn(turn):
+                start = time.perf_counter()
+                resp = agent.run_sync(user_prompt=user_input, message_history=history)
+                usage = resp.usage()
+                metrics.record_llm_usage(usage.input_tokens, usage.output_tokens, time.perf_counter() - start, model="deepseek-chat")
+        except KeyboardInterrupt:
+            # Ctrl-C 放弃本轮，同时终止数据库中仍在执行的查询
+            killed = sql_tools.cancel_all()
+            print(f"\n已取消本轮查询（终止 {killed} 条执行中的SQL）")
+            continue
         history = list(resp.all_messages())
         print(resp.output)
+    # 退出时写出指标和时间线
+    metrics.dump(".logs")
 
 if __name__ == "__main__":
     main()
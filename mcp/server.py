@@ -3,28 +3,42 @@ from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
 import os
 import json
-import mysql.connector
-from mysql.connector import Error
+import sys
+import atexit
+import functools
+from contextlib import contextmanager, nullcontext
 from pydantic import BaseModel, Field
 import asyncio
-from mcp.server.fastmcp import FastMCP
-import logging
+from mcp.server.fastmcp import FastMCP, Context
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-
-logger = logging.getLogger("mysql_mcp_server")
-file_handler = logging.FileHandler(filename=".logs/mcp_server.log",encoding="utf-8")
-file_handler.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
+# 复用项目根目录下的 src 模块（追加到 sys.path 末尾，避免遮蔽已安装的 mcp 包）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.metrics import metrics, estimate_bytes
+from src.cancellation import QueryTracker
+from src.admission import AdmissionScheduler, AdmissionRejected
+from src.schema_cache import SchemaCache
+from src.readonly import is_read_only, read_only_transaction
+from src.catalog import Catalog
+from src.summarizer import Summarizer, chunk_comments
+from src.querylog import QueryLog, setup_logging
+from src.changefeed import ChangeFeed, COMMENT_TABLE, VIDEO_TABLE
 
-logger.addHandler(file_handler)
 load_dotenv()
+# 日志经队列由后台线程写入文件，工具调用路径上不做磁盘 IO；stderr 只输出 WARNING 以上
+logger = setup_logging("mysql_mcp_server", os.getenv("MCP_LOG_FILE", ".logs/mcp_server.log"))
+# 按SQL指纹汇总次数和耗时，慢查询写日志，其余语句按比例抽样写日志
+query_log = QueryLog(
+    logger,
+    slow_seconds=float(os.getenv("MCP_SLOW_QUERY_MS", 1000)) / 1000,
+    sample_rate=float(os.getenv("MCP_QUERY_LOG_SAMPLE", 0.01)),
+)
 mcp = FastMCP("mysql_mcp_server")
 
+# 设置 METRICS_PORT 时开放 HTTP 指标端点；进程退出时把指标和时间线写入 .logs
+if os.getenv("METRICS_PORT"):
+    metrics.serve(int(os.getenv("METRICS_PORT")))
+atexit.register(metrics.dump, ".logs")
+
 def get_db_config():
     return {
         'host': os.getenv("MYSQL_HOST"),
@@ -34,6 +48,46 @@ def get_db_config():
         'database': os.getenv("MYSQL_DATABASE")
     }
 
+# 单条查询的超时时间（秒），超时或调用被取消时对数据库执行 KILL QUERY
+QUERY_TIMEOUT = float(os.getenv("MYSQL_QUERY_TIMEOUT", 60))
+# 导出到文件的超时时间（秒）
+EXPORT_TIMEOUT = float(os.getenv("MYSQL_EXPORT_TIMEOUT", 600))
+query_tracker = QueryTracker(get_db_config)
+
+# 元数据查询和分析查询分通道准入，互不阻塞；有其他客户端排队时，单个客户端最多占用 MCP_CLIENT_SHARE 个执行槽
+scheduler = AdmissionScheduler({
+    "metadata": dict(
+        concurrency=int(os.getenv("MCP_METADATA_CONCURRENCY", 8)),
+        max_queue=int(os.getenv("MCP_QUEUE_LIMIT", 32)),
+        per_client_limit=int(os.getenv("MCP_CLIENT_SHARE", 2)),
+    ),
+    "analytical": dict(
+        concurrency=int(os.getenv("MCP_ANALYTICAL_CONCURRENCY", 4)),
+        max_queue=int(os.getenv("MCP_QUEUE_LIMIT", 32)),
+        per_client_limit=int(os.getenv("MCP_CLIENT_SHARE", 2)),
+    ),
+})
+
+# execute_many 整批占用一个分析通道执行槽，批内同时执行的语句数上限
+BATCH_CONCURRENCY = int(os.getenv("MCP_BATCH_CONCURRENCY", 4))
+
+# 表结构和列统计缓存
+schema_cache = SchemaCache(ttl=float(os.getenv("SCHEMA_CACHE_TTL", 600)))
+# 长文本 map-reduce 摘要，分块摘要按内容哈希缓存
+summarizer = Summarizer()
+# summarize_video 最多读取的评论条数（按点赞数取前若干条），限制分块摘要的调用次数
+SUMMARY_MAX_COMMENTS = int(os.getenv("SUMMARY_MAX_COMMENTS", 500))
+
+def client_key(ctx: Context = None) -> str:
+    """区分调用方：优先使用客户端上报的 client_id，否则按 MCP 会话区分"""
+    if ctx is None:
+        return "default"
+    try:
+        return ctx.client_id or f"session-{id(ctx.session)}"
+    except ValueError:
+        # 不在请求上下文中
+        return "default"
+
 @mcp.prompt(title="MySQL数据库智能查询助手")
 async def get_system_prompt() -> str:
         """系统提示词：定义Agent的行为逻辑"""
@@ -44,44 +98,192 @@ async def get_system_prompt() -> str:
         3. 可以根据用户需求生成SQL语句,调用execute_query工具执行返回结果并分析
         4. 回答时要清晰、结构化，使用中文，数据展示要易读
         5. 如果工具调用失败或无数据，要友好提示
+        6. 当用户需要大量明细数据（如某个视频的全部评论）时，调用export_query工具导出到文件，只向用户说明文件路径、行数和字段
+        7. 需要多条互不依赖的统计结果时，调用execute_many工具一次并发执行，减少工具调用次数
+        8. 编写SQL前如需了解字段取值（空值、取值范围、高频值等），先调用get_table_profile工具，避免多次探索性查询
+        9. 数据分布在多个库时，先调用list_databases工具查看可用的库，再通过各工具的database参数指定要查询的库
+        10. 需要概括视频内容或大量评论时，调用summarize_video工具获取摘要，不要直接查询 video_content 或全部评论原文
+        11. 用户问"最近新增了哪些评论/视频"或需要增量分析时，调用get_changes工具按游标获取新增行，不要重新扫描全表
         """
 
-def connect_mysql():
-    """连接MySQL数据库"""
-    config = get_db_config()
-    mysql_conn = mysql.connector.connect(**config)  
-    return mysql_conn
+# 多库多实例目录：按 (实例, 库) 延迟创建连接池，只读查询路由到延迟最低的健康副本
+catalog = Catalog()
 
+@contextmanager
+def db_connection(database: str = None, read_only: bool = False, token: int = None):
+    """借出一个路由后的连接并登记到 query_tracker，块结束时回滚并归还连接池；
+    只读查询在只读事务中执行，其他语句不提交（与不使用连接池时的行为一致）"""
+    with catalog.connection(database, read_only) as (endpoint, mysql_conn):
+        with query_tracker.track(mysql_conn, token, endpoint.config), read_only_transaction(mysql_conn, read_only):
+            yield mysql_conn
 
-@mcp.tool(title="执行MySQL查询")
-async def execute_query(query: str, params: tuple = None) -> list:
-    """执行查询并返回结果"""
-    logger.info(f"执行查询: {query}")
-    result = []
-    try:
-        with connect_mysql() as mysql_conn:
+def table_key(table_name: str, database: str = None) -> str:
+    """缓存键：默认库只用表名，其他库加库名前缀"""
+    if not database or database == catalog.default_database:
+        return table_name
+    return f"{database}.{table_name}"
+
+# 默认库评论表、视频表的新增数据捕获：按主键高水位轮询主库，发现新数据时通知订阅者；
+# 服务启动时开始后台轮询（CHANGEFEED_INTERVAL=0 时只在调用 get_changes 时轮询）
+CHANGEFEED_INTERVAL = float(os.getenv("CHANGEFEED_INTERVAL", 60))
+change_feed = ChangeFeed(functools.partial(db_connection, None, False))
+
+def on_table_change(table: str, change: dict):
+    """有新增数据时把该表的列统计标记为过期，下次调用 get_table_profile 时增量抽样"""
+    schema_cache.expire(table, kind="profile")
+    logger.info(f"{table} 新增 {change['rows']} 行（{change['from']} -> {change['to']}）")
+
+change_feed.subscribe(on_table_change)
+
+def instrumented(func):
+    """工具调用耗时统计，写入 mcp_tool_seconds{tool=...}"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with metrics.timer("mcp_tool", tool=func.__name__):
+            return await func(*args, **kwargs)
+    return wrapper
+
+def run_query(query: str, params: tuple = None, token: int = None, database: str = None) -> list:
+    """执行查询并记录数据库往返、返回行数和字节数；token 用于取消执行中的语句"""
+    with metrics.timer("db_query"):
+        with db_connection(database, is_read_only(query), token) as mysql_conn, query_log.track(query) as info:
             cursor = mysql_conn.cursor(dictionary=True)
             cursor.execute(query, params or ())
             result = cursor.fetchall()
             cursor.close()
-            return result
+            info["rows"] = len(result)
+    metrics.inc("db_round_trips_total")
+    metrics.inc("db_rows_returned_total", len(result))
+    metrics.inc("db_bytes_returned_total", estimate_bytes(result))
+    return result
+
+def run_profile(table_name: str, params: tuple = None, token: int = None, state: dict = None,
+                database: str = None) -> dict:
+    """抽样计算表的列统计，state 不为空时只增量抽样新增的主键区间"""
+    from src.profiler import profile_table
+    database = database or catalog.default_database
+    with metrics.timer("db_profile"):
+        with db_connection(database, True, token) as mysql_conn:
+            return profile_table(mysql_conn, database, table_name, state)
+
+def run_export(query: str, params: tuple = None, token: int = None, fmt: str = "parquet",
+               database: str = None) -> dict:
+    """把查询结果分批写入文件，返回文件句柄、行数和字段类型"""
+    from src.export import export_query as export_to_file
+    with metrics.timer("db_export"):
+        with db_connection(database, True, token) as mysql_conn, query_log.track(query) as info:
+            result = export_to_file(mysql_conn, query, params, fmt=fmt)
+            info["rows"] = result["row_count"]
+    metrics.inc("db_round_trips_total")
+    metrics.inc("db_rows_returned_total", result["row_count"])
+    metrics.inc("db_bytes_exported_total", result["bytes"])
+    return result
+
+def run_limited_query(query: str, params: tuple = None, token: int = None, max_rows: int = 1000,
+                      timeout: float = None, database: str = None) -> dict:
+    """执行单条只读查询，最多返回 max_rows 行，timeout 通过 max_execution_time 交给 MySQL 限制"""
+    with metrics.timer("db_query"):
+        with db_connection(database, True, token) as mysql_conn, query_log.track(query) as info:
+            cursor = mysql_conn.cursor(dictionary=True)
+            if timeout:
+                # 会话变量在连接归还连接池时会被重置
+                cursor.execute("SET SESSION max_execution_time = %s", (int(timeout * 1000),))
+            cursor.execute(query, params or ())
+            rows = cursor.fetchmany(max_rows + 1)
+            truncated = len(rows) > max_rows
+            if truncated:
+                mysql_conn.consume_results()
+            cursor.close()
+            info["rows"] = len(rows)
+    rows = rows[:max_rows]
+    metrics.inc("db_round_trips_total")
+    metrics.inc("db_rows_returned_total", len(rows))
+    metrics.inc("db_bytes_returned_total", estimate_bytes(rows))
+    return {"rows": rows, "truncated": truncated}
+
+async def _run_db(runner, query: str, params: tuple = None, lane: str = "analytical", ctx: Context = None,
+                  timeout: float = None, admit: bool = True):
+    """经准入调度后在线程中执行 runner(query, params, token)；超时或调用被取消时终止数据库中的语句。
+    admit=False 用于调用方已经整体准入的批量任务"""
+    timeout = timeout or QUERY_TIMEOUT
+    token = query_tracker.new_token()
+    try:
+        async with scheduler.admit(lane, client_key(ctx)) if admit else nullcontext():
+            return await asyncio.wait_for(asyncio.to_thread(runner, query, params, token), timeout)
+    except asyncio.TimeoutError:
+        await asyncio.to_thread(query_tracker.cancel, token)
+        logger.error(f"查询超时（{timeout}s），已终止: {query}")
+        raise RuntimeError(f"查询超时（{timeout}s），已终止，请缩小查询范围")
+    except asyncio.CancelledError:
+        # 客户端取消或断开，确保数据库中的语句也被终止
+        await asyncio.shield(asyncio.to_thread(query_tracker.cancel, token))
+        logger.info(f"查询已取消: {query}")
+        raise
+    finally:
+        query_tracker.release(token)
+
+async def _execute(query: str, params: tuple = None, lane: str = "analytical", ctx: Context = None,
+                   database: str = None) -> list:
+    """执行查询，失败时记录日志并返回空结果"""
+    from mysql.connector import Error
+    runner = functools.partial(run_query, database=database)
+    try:
+        return await _run_db(runner, query, params, lane=lane, ctx=ctx)
     except Error as e:
         logger.error(f"查询执行失败: {e}")
         return []
 
+
+@mcp.tool(title="执行MySQL查询")
+@instrumented
+async def execute_query(query: str, params: tuple = None, database: str = None, ctx: Context = None) -> list:
+    """执行查询并返回结果；database 为空时使用默认库，只读查询会路由到副本"""
+    return await _execute(query, params, ctx=ctx, database=database)
+
+@mcp.tool(title="批量执行MySQL只读查询")
+@instrumented
+async def execute_many(queries: list[str], max_rows: int = 1000, timeout: float = 30, database: str = None,
+                       ctx: Context = None) -> list:
+    """并发执行多条互不依赖的只读查询（SELECT/SHOW/DESCRIBE/EXPLAIN/WITH），一次返回全部结果；
+    每条最多返回 max_rows 行、最长执行 timeout 秒，单条失败不影响其他语句。
+    整批作为一个任务准入，批内最多 MCP_BATCH_CONCURRENCY 条语句同时执行"""
+    from mysql.connector import Error
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run_one(query: str) -> dict:
+        if not is_read_only(query):
+            return {"query": query, "error": "只允许单条只读语句"}
+        runner = functools.partial(run_limited_query, max_rows=max_rows, timeout=timeout, database=database)
+        try:
+            async with slots:
+                result = await _run_db(runner, query, ctx=ctx, timeout=timeout + 5, admit=False)
+        except (Error, RuntimeError) as e:
+            logger.error(f"查询执行失败: {e}")
+            return {"query": query, "error": str(e)}
+        return {"query": query, **result}
+
+    try:
+        async with scheduler.admit("analytical", client_key(ctx)):
+            return await asyncio.gather(*(run_one(query) for query in queries))
+    except AdmissionRejected as e:
+        return [{"query": query, "error": str(e)} for query in queries]
+
 @mcp.tool(title="获取MySQL数据库所有表名")
-async def get_tables() -> list:
-    """获取数据库中所有表名"""
+@instrumented
+async def get_tables(database: str = None, ctx: Context = None) -> list:
+    """获取数据库中所有表名，database 为空时使用默认库"""
     query = """
     SELECT table_name 
     FROM information_schema.tables 
     WHERE table_schema = %s AND table_type = 'BASE TABLE'
     """
-    result = await execute_query(query, (mysql_conn.config.database,))
+    database = database or catalog.default_database
+    result = await _execute(query, (database,), lane="metadata", ctx=ctx, database=database)
     return [item["TABLE_NAME"] for item in result]
     
 @mcp.tool(title="获取MySQL数据库表结构")
-async def get_table_structure(table_name: str) -> list:
+@instrumented
+async def get_table_structure(table_name: str, database: str = None, ctx: Context = None) -> list:
     """获取指定表的结构（字段名、类型、注释等）"""
     query = """
     SELECT 
@@ -94,35 +296,173 @@ async def get_table_structure(table_name: str) -> list:
     WHERE table_schema = %s AND table_name = %s
     ORDER BY ordinal_position
     """
-    result = await execute_query(query, (mysql_conn.config.database, table_name))
+    database = database or catalog.default_database
+    result = schema_cache.get("structure", table_key(table_name, database))
+    if result is None:
+        result = await _execute(query, (database, table_name), lane="metadata", ctx=ctx, database=database)
+        if result:
+            schema_cache.put("structure", table_key(table_name, database), result)
     return result
 
 @mcp.tool(title="获取MySQL数据库表注释")
-async def get_table_comment(table_name: str) -> str:
+@instrumented
+async def get_table_comment(table_name: str, database: str = None, ctx: Context = None) -> str:
     """获取表的注释（表的作用）"""
     query = """
     SELECT table_comment 
     FROM information_schema.tables 
     WHERE table_schema = %s AND table_name = %s
     """
-    result = await execute_query(query, (mysql_conn.config.database, table_name))
+    database = database or catalog.default_database
+    result = await _execute(query, (database, table_name), lane="metadata", ctx=ctx, database=database)
     return result[0]["TABLE_COMMENT"] if result else "无注释"
 
 @mcp.tool(title="获取MySQL数据库表数据量")
-async def get_table_row_count(table_name: str) -> int:  
+@instrumented
+async def get_table_row_count(table_name: str, database: str = None, ctx: Context = None) -> int:  
     """获取指定表的数据量"""
     query = f"SELECT COUNT(*) AS count FROM {table_name}"
-    result = await execute_query(query) 
+    result = await _execute(query, ctx=ctx, database=database)
     return result[0]["count"] if result else 0
 
 @mcp.tool(title="获取MySQL数据库表前N行数据")
-async def get_table_top_rows(table_name: str, sort_by: str = "create_time", sort_method: str = "desc", limit: int = 10) -> list:
+@instrumented
+async def get_table_top_rows(table_name: str, sort_by: str = "create_time", sort_method: str = "desc", limit: int = 10,
+                            database: str = None, ctx: Context = None) -> list:
     """获取指定表的前N行数据，默认按创建时间(create_time)倒序排序"""
     query = f"SELECT * FROM {table_name} ORDER BY {sort_by} {sort_method} LIMIT %s"
-    result = await execute_query(query, (limit,))
+    result = await _execute(query, (limit,), ctx=ctx, database=database)
     return result
 
+@mcp.tool(title="导出MySQL查询结果到文件")
+@instrumented
+async def export_query(query: str, format: str = "parquet", params: tuple = None, database: str = None,
+                       ctx: Context = None) -> dict:
+    """把只读查询的结果分批写入本地 Parquet/CSV 文件，只返回文件路径、行数和字段类型，适合导出大量数据"""
+    from mysql.connector import Error
+    if not is_read_only(query):
+        return {"error": "只允许导出单条只读查询"}
+    runner = functools.partial(run_export, fmt=format, database=database)
+    try:
+        return await _run_db(runner, query, params, ctx=ctx, timeout=EXPORT_TIMEOUT)
+    except (Error, ValueError, ImportError) as e:
+        logger.error(f"导出失败: {e}")
+        return {"error": str(e)}
+
+@mcp.tool(title="获取MySQL数据库表列统计")
+@instrumented
+async def get_table_profile(table_name: str, refresh: bool = False, full: bool = False, database: str = None,
+                            ctx: Context = None) -> dict:
+    """获取表各字段的统计信息（空值率、近似去重数、最小/最大值、高频值、直方图），基于主键区间抽样并缓存；
+    refresh=True 时增量抽样新增数据，full=True 时重新全量抽样"""
+    from mysql.connector import Error
+    from src.profiler import summarize_profile
+    key = table_key(table_name, database)
+    state = None if full else schema_cache.get("profile", key, allow_stale=True)
+    if state is None or refresh or schema_cache.expired("profile", key):
+        runner = functools.partial(run_profile, state=state, database=database)
+        try:
+            state = await _run_db(runner, table_name, ctx=ctx)
+        except Error as e:
+            logger.error(f"列统计失败: {e}")
+            return {"error": str(e)}
+        schema_cache.put("profile", key, state)
+    return summarize_profile(state)
+
+@mcp.tool(title="摘要视频内容和评论")
+@instrumented
+async def summarize_video(video_id: int, include_comments: bool = True, focus: str = None,
+                          max_comments: int = SUMMARY_MAX_COMMENTS, database: str = None, ctx: Context = None) -> dict:
+    """摘要指定视频的 video_content 和点赞数最高的 max_comments 条评论：按 token 预算分块并发摘要后逐层合并，
+    focus 可指定侧重点（如"用户情感"）"""
+    videos = await _execute(
+        f"SELECT video_content FROM `{VIDEO_TABLE}` WHERE video_id = %s", (video_id,), ctx=ctx, database=database
+    )
+    if not videos:
+        return {"error": f"视频 {video_id} 不存在或查询失败"}
+    comments = []
+    if include_comments:
+        comments = await _execute(
+            f"SELECT comment_content, likes_count FROM `{COMMENT_TABLE}` WHERE video_id = %s "
+            f"ORDER BY likes_count DESC LIMIT %s",
+            (video_id, min(max_comments, SUMMARY_MAX_COMMENTS)), ctx=ctx, database=database,
+        )
+    try:
+        content, comment = await asyncio.gather(
+            summarizer.summarize(videos[0]["video_content"] or "", "视频内容", focus),
+            summarizer.summarize_chunks(chunk_comments(comments, summarizer.chunk_tokens), "视频评论", focus),
+        )
+    except Exception as e:
+        logger.error(f"摘要失败: {e}")
+        return {"error": str(e)}
+    return {
+        "video_id": video_id,
+        "content_summary": content["summary"],
+        "content_chunks": content["chunks"],
+        "comment_summary": comment["summary"],
+        "comments": len(comments),
+        "comment_chunks": comment["chunks"],
+    }
+
+@mcp.tool(title="获取MySQL数据库列表")
+@instrumented
+async def list_databases(refresh: bool = False) -> dict:
+    """列出各实例上可查询的数据库及实例状态（角色、健康、延迟），其他工具可通过 database 参数指定库"""
+    databases = await asyncio.to_thread(catalog.discover, refresh)
+    return {
+        "default_database": catalog.default_database,
+        "databases": databases,
+        "endpoints": catalog.status(),
+    }
+
+@mcp.tool(title="获取MySQL表新增数据")
+@instrumented
+async def get_changes(table_name: str, cursor: int = None, limit: int = 100, ctx: Context = None) -> dict:
+    """返回评论表或视频表中主键大于 cursor 的新增行（按主键升序，最多 limit 行）和下一次调用使用的 next_cursor；
+    cursor 为空时返回服务开始跟踪以来新增的行。changes 为对应区间的变更记录（时间、行数）"""
+    from mysql.connector import Error
+    try:
+        column = change_feed.column(table_name)
+        await asyncio.to_thread(change_feed.poll)
+    except (Error, ValueError) as e:
+        logger.error(f"获取变更失败: {e}")
+        return {"error": str(e)}
+    if table_name in change_feed.errors:
+        logger.error(f"获取变更失败: {change_feed.errors[table_name]}")
+        return {"error": change_feed.errors[table_name]}
+    since = change_feed.cursor(table_name, cursor)
+    if since is None:
+        query = f"SELECT * FROM `{table_name}` ORDER BY `{column}` LIMIT %s"
+        params = (limit,)
+    else:
+        query = f"SELECT * FROM `{table_name}` WHERE `{column}` > %s ORDER BY `{column}` LIMIT %s"
+        params = (since, limit)
+    rows = await _execute(query, params, ctx=ctx)
+    return {
+        "rows": rows,
+        "next_cursor": rows[-1][column] if rows else since,
+        "high_water": change_feed.high_water(table_name),
+        "changes": [c for c in change_feed.log(table_name) if since is None or c["to"] > since],
+    }
+
+@mcp.tool(title="获取SQL指纹统计")
+async def get_query_stats(limit: int = 20, order_by: str = "total_seconds") -> list:
+    """按SQL指纹（去掉字面量后的语句形状）汇总的执行次数、错误数、返回行数和耗时，
+    order_by 可选 total_seconds / count / avg_seconds / max_seconds / errors / slow"""
+    return query_log.top(limit, order_by)
+
+@mcp.tool(title="获取MCP服务指标")
+async def get_metrics(format: str = "json") -> str:
+    """获取服务指标：format=json 返回JSON，format=prometheus 返回 Prometheus 文本，format=trace 返回调用时间线"""
+    if format == "prometheus":
+        return metrics.to_prometheus()
+    if format == "trace":
+        return json.dumps(metrics.trace(), ensure_ascii=False, default=str)
+    return json.dumps(metrics.to_json(), ensure_ascii=False)
+
 
 if __name__ == "__main__":
+    if CHANGEFEED_INTERVAL > 0:
+        change_feed.start(CHANGEFEED_INTERVAL)
     asyncio.run(mcp.run())
     # asyncio.run(mcp.serve(host="0.0.0.0",port=8000))
\ No newline at end of file
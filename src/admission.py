@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# admission.py - 数据库工作的准入调度：分通道并发、按客户端公平分配、队列满时快速拒绝
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from src.metrics import metrics
+
+
+class AdmissionRejected(Exception):
+    """队列已满，请求被拒绝"""
+
+
+class Lane:
+    """一个并发通道：最多 concurrency 个任务同时执行，等待队列按客户端轮转出队"""
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, per_client_limit: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        # 有其他客户端排队时，单个客户端最多占用的执行槽；没有其他客户端排队时不限制，执行槽不会空闲
+        self.per_client_limit = per_client_limit
+        self.running = 0
+        self.running_by_client = {}
+        # client -> 等待中的 future 队列；OrderedDict 的顺序即轮转顺序
+        self.waiting = OrderedDict()
+        self.queued = 0
+
+    def _start(self, client: str):
+        self.running += 1
+        self.running_by_client[client] = self.running_by_client.get(client, 0) + 1
+
+    def _dispatch(self):
+        """按客户端轮转，把空出的执行槽分给下一个等待者：优先未达到份额的客户端，
+        等待中的客户端都已达到份额时仍按轮转顺序分配"""
+        while self.running < self.concurrency and self.waiting:
+            clients = list(self.waiting)
+            client = next(
+                (c for c in clients if self.running_by_client.get(c, 0) < self.per_client_limit), clients[0]
+            )
+            queue = self.waiting[client]
+            future = queue.popleft()
+            self.queued -= 1
+            if queue:
+                # 该客户端移到队尾，下一轮先服务其他客户端
+                self.waiting.move_to_end(client)
+            else:
+                del self.waiting[client]
+            if future.cancelled():
+                continue
+            self._start(client)
+            future.set_result(None)
+
+    async def acquire(self, client: str):
+        if not self.waiting and self.running < self.concurrency:
+            self._start(client)
+            return
+        if self.queued >= self.max_queue:
+            metrics.inc("admission_rejected_total", lane=self.name)
+            raise AdmissionRejected(f"{self.name} 队列已满（{self.max_queue}），请稍后重试")
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.setdefault(client, deque()).append(future)
+        self.queued += 1
+        metrics.set_gauge("admission_queue_depth", self.queued, lane=self.name)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已分配到执行槽后才被取消，归还该槽
+                self.release(client)
+            else:
+                queue = self.waiting.get(client)
+                if queue and future in queue:
+                    queue.remove(future)
+                    self.queued -= 1
+                    if not queue:
+                        del self.waiting[client]
+            raise
+        finally:
+            metrics.set_gauge("admission_queue_depth", self.queued, lane=self.name)
+
+    def release(self, client: str):
+        self.running -= 1
+        count = self.running_by_client.get(client, 1) - 1
+        if count:
+            self.running_by_client[client] = count
+        else:
+            self.running_by_client.pop(client, None)
+        self._dispatch()
+
+
+class AdmissionScheduler:
+    """按通道（metadata / analytical）管理数据库工作的准入"""
+
+    def __init__(self, lanes: dict):
+        self.lanes = {name: Lane(name, **config) for name, config in lanes.items()}
+
+    @asynccontextmanager
+    async def admit(self, lane: str, client: str = "default"):
+        """进入指定通道执行，记录排队等待时间；队列满时立即抛出 AdmissionRejected"""
+        target = self.lanes[lane]
+        start = time.perf_counter()
+        await target.acquire(client)
+        metrics.observe("admission_wait_seconds", time.perf_counter() - start, lane=lane)
+        metrics.set_gauge("admission_running", target.running, lane=lane)
+        try:
+            yield
+        finally:
+            target.release(client)
+            metrics.set_gauge("admission_running", target.running, lane=lane)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# cancellation.py - 跟踪执行中的语句，取消/超时时通过旁路连接 KILL QUERY
+import itertools
+import threading
+from contextlib import contextmanager
+
+from src.metrics import metrics
+
+
+class QueryCancelled(Exception):
+    """语句在开始执行前已被取消"""
+
+
+class QueryTracker:
+    """记录每条执行中语句所在的 MySQL 连接ID，取消时从另一条连接发送 KILL QUERY"""
+
+    def __init__(self, db_config):
+        # 数据库配置，或返回配置的函数（延迟到真正需要 KILL 时再读取）
+        self.db_config = db_config
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+        # token -> (connection_id, 所在实例的连接配置)
+        self._running = {}
+        # 已分配但语句尚未开始的 token
+        self._pending = set()
+        # 在语句开始前就被取消的 token
+        self._cancelled = set()
+
+    def new_token(self) -> int:
+        """分配一个取消令牌，可以在语句真正开始执行前传给 track"""
+        token = next(self._counter)
+        with self._lock:
+            self._pending.add(token)
+        return token
+
+    @contextmanager
+    def track(self, conn, token: int = None, db_config: dict = None):
+        """在块内执行的语句可以通过 token 被取消；语句不在默认实例上时通过 db_config 指定 KILL 的目标实例"""
+        token = token or self.new_token()
+        with self._lock:
+            self._pending.discard(token)
+            if token in self._cancelled:
+                self._cancelled.discard(token)
+                raise QueryCancelled("查询已取消")
+            self._running[token] = (conn.connection_id, db_config)
+        try:
+            yield token
+        finally:
+            with self._lock:
+                self._running.pop(token, None)
+
+    def cancel(self, token: int) -> bool:
+        """取消指定令牌对应的语句，返回是否真正终止了执行中的语句"""
+        with self._lock:
+            running = self._running.pop(token, None)
+            if running is None:
+                if token in self._pending:
+                    self._pending.discard(token)
+                    self._cancelled.add(token)
+                return False
+        self._kill([running])
+        return True
+
+    def release(self, token: int):
+        """调用方结束时释放未使用的令牌（语句可能因建连失败等原因从未开始）"""
+        with self._lock:
+            self._pending.discard(token)
+
+    def cancel_all(self) -> int:
+        """取消所有执行中的语句，返回终止的数量"""
+        with self._lock:
+            running = list(self._running.values())
+            self._running.clear()
+        if running:
+            self._kill(running)
+        return len(running)
+
+    def _kill(self, running: list):
+        import mysql.connector
+
+        default_config = self.db_config() if callable(self.db_config) else self.db_config
+        # 按实例分组，每个实例开一条旁路连接
+        by_instance = {}
+        for connection_id, db_config in running:
+            config = db_config or default_config
+            key = (config.get("host"), config.get("port"))
+            by_instance.setdefault(key, (config, []))[1].append(connection_id)
+        for config, connection_ids in by_instance.values():
+            with mysql.connector.connect(**config) as side_conn:
+                cursor = side_conn.cursor()
+                for connection_id in connection_ids:
+                    try:
+                        cursor.execute(f"KILL QUERY {int(connection_id)}")
+                        metrics.inc("db_queries_killed_total")
+                    except mysql.connector.Error:
+                        # 语句可能在 KILL 之前已经结束
+                        pass
+                cursor.close()
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+# catalog.py - 多库多实例目录：发现各实例上的数据库，按 (实例, 库) 延迟创建连接池，只读查询路由到副本
+#
+# 实例配置来自 MYSQL_ENDPOINTS（JSON 列表），例如：
+#   [{"name": "primary", "host": "10.0.0.1", "port": 3306, "user": "u", "password": "p", "role": "primary"},
+#    {"name": "replica1", "host": "10.0.0.2", "port": 3306, "user": "u", "password": "p", "role": "replica"}]
+# 未配置时只使用 MYSQL_HOST/MYSQL_PORT/... 对应的单个主库；MYSQL_REPLICAS=host:port,host:port 可追加与主库同账号的副本。
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from src.metrics import metrics
+
+SYSTEM_DATABASES = {"information_schema", "mysql", "performance_schema", "sys"}
+# 连接不上实例 / 连接中断，只有这类错误才把实例标记为不健康
+CONNECTION_ERRNOS = {2003, 2013}
+
+
+def is_connection_error(error) -> bool:
+    """区分实例不可用和库不存在（1049）、无权限（1044）等与实例健康无关的错误"""
+    import mysql.connector
+
+    return isinstance(error, (mysql.connector.InterfaceError, mysql.connector.OperationalError)) \
+        or getattr(error, "errno", None) in CONNECTION_ERRNOS
+
+
+class Endpoint:
+    """一个 MySQL 实例，记录延迟（EWMA）、进行中的请求数和健康状态"""
+
+    def __init__(self, name: str, config: dict, role: str = "primary", databases: list = None):
+        self.name = name
+        self.config = config
+        self.role = role
+        # 限定该实例上可用的库，None 表示通过 SHOW DATABASES 发现
+        self.databases = set(databases) if databases else None
+        self.latency = None
+        self.inflight = 0
+        self.down_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.time() >= self.down_until
+
+    def score(self) -> float:
+        """路由打分：观测延迟 × (进行中请求数 + 1)，越小越优先"""
+        return (self.latency or 0.001) * (self.inflight + 1)
+
+    def observe(self, seconds: float, alpha: float = 0.2):
+        self.latency = seconds if self.latency is None else alpha * seconds + (1 - alpha) * self.latency
+        metrics.set_gauge("db_endpoint_latency_seconds", self.latency, endpoint=self.name)
+
+
+def load_endpoints() -> list:
+    """从环境变量读取实例配置"""
+    if os.getenv("MYSQL_ENDPOINTS"):
+        endpoints = []
+        for item in json.loads(os.getenv("MYSQL_ENDPOINTS")):
+            item = dict(item)
+            name = item.pop("name", None) or f"{item['host']}:{item.get('port', 3306)}"
+            role = item.pop("role", "primary")
+            databases = item.pop("databases", None)
+            item.setdefault("port", 3306)
+            endpoints.append(Endpoint(name, item, role, databases))
+        return endpoints
+    base = {
+        "host": os.getenv("MYSQL_HOST"),
+        "port": int(os.getenv("MYSQL_PORT", 3306)),
+        "user": os.getenv("MYSQL_USER"),
+        "password": os.getenv("MYSQL_PASSWORD"),
+    }
+    endpoints = [Endpoint("primary", base, "primary")]
+    for address in filter(None, (os.getenv("MYSQL_REPLICAS") or "").split(",")):
+        host, _, port = address.strip().partition(":")
+        endpoints.append(Endpoint(f"replica-{host}:{port or 3306}", {**base, "host": host, "port": int(port or 3306)}, "replica"))
+    return endpoints
+
+
+class Catalog:
+    """数据库目录和连接路由"""
+
+    def __init__(self, endpoints: list = None, default_database: str = None, pool_size: int = None,
+                 down_seconds: float = 30, missing_seconds: float = 60):
+        self.endpoints = {e.name: e for e in (endpoints or load_endpoints())}
+        self.default_database = default_database or os.getenv("MYSQL_DATABASE")
+        self.pool_size = pool_size or int(os.getenv("MYSQL_POOL_SIZE", 16))
+        # 实例连接失败后暂停路由的秒数
+        self.down_seconds = down_seconds
+        # 建立连接的超时秒数，实例不可达时尽快失败转移
+        self.connect_timeout = int(os.getenv("MYSQL_CONNECT_TIMEOUT", 5))
+        self._lock = threading.Lock()
+        # (endpoint, database) -> (pool, semaphore)
+        self._pools = {}
+        # (endpoint, database) -> 创建该连接池的锁，建池时不持有全局锁
+        self._pool_locks = {}
+        # database -> [endpoint name]
+        self._databases = None
+        # 重新发现后仍不存在的库 -> 过期时间，期间不再为它刷新发现
+        self.missing_seconds = missing_seconds
+        self._missing = {}
+        # 发现时连接失败的实例：先按承载所有库处理，由 healthy 控制路由，恢复后重新发现
+        self._undiscovered = set()
+        # 串行化发现过程，避免多个工作线程同时刷新
+        self._discover_lock = threading.Lock()
+
+    def _connect_config(self, endpoint: Endpoint) -> dict:
+        """实例的连接参数，未单独配置 connection_timeout 时使用 connect_timeout"""
+        return {"connection_timeout": self.connect_timeout, **endpoint.config}
+
+    # ---- 发现 ----
+    def _discovery_due(self) -> bool:
+        return self._databases is None or any(self.endpoints[name].healthy for name in self._undiscovered)
+
+    def discover(self, refresh: bool = False) -> dict:
+        """返回 {库名: [实例名]}，首次调用时在各实例上执行 SHOW DATABASES；
+        发现失败的实例在其 down_until 到期后的下一次调用时重试"""
+        if not refresh and not self._discovery_due():
+            return self._databases
+        import mysql.connector
+
+        with self._discover_lock:
+            if not refresh and not self._discovery_due():
+                return self._databases
+            databases, undiscovered = {}, set()
+            for endpoint in self.endpoints.values():
+                names = endpoint.databases
+                if names is None:
+                    try:
+                        with mysql.connector.connect(**self._connect_config(endpoint)) as conn:
+                            cursor = conn.cursor()
+                            cursor.execute("SHOW DATABASES")
+                            names = {row[0] for row in cursor.fetchall()} - SYSTEM_DATABASES
+                            cursor.close()
+                    except mysql.connector.Error:
+                        self._mark_down(endpoint)
+                        undiscovered.add(endpoint.name)
+                        continue
+                for name in names:
+                    databases.setdefault(name, []).append(endpoint.name)
+            # 未能发现的实例保留在所有库的候选中，是否可用交给 healthy 判断
+            for names in databases.values():
+                names.extend(sorted(undiscovered))
+            self._undiscovered = undiscovered
+            self._databases = databases
+            return databases
+
+    def endpoints_for(self, database: str) -> list:
+        names = self.discover().get(database)
+        if names is None and self._missing.get(database, 0) <= time.time():
+            # 可能是新建的库，重新发现一次；仍不存在时在 missing_seconds 内不再刷新
+            names = self.discover(refresh=True).get(database)
+            if names is None:
+                self._missing[database] = time.time() + self.missing_seconds
+        if not names:
+            # 无法发现时退回所有实例，由 MySQL 报告库不存在
+            return list(self.endpoints.values())
+        return [self.endpoints[name] for name in names]
+
+    # ---- 路由 ----
+    def choose(self, database: str, read_only: bool = False, exclude: set = ()) -> Endpoint:
+        """只读查询选择健康副本中得分最低的实例，写操作或没有可用副本时使用主库"""
+        candidates = [e for e in self.endpoints_for(database) if e.name not in exclude]
+        if read_only:
+            replicas = [e for e in candidates if e.role == "replica" and e.healthy]
+            if replicas:
+                return min(replicas, key=Endpoint.score)
+        primaries = [e for e in candidates if e.role == "primary"]
+        healthy = [e for e in primaries if e.healthy] or primaries
+        if not healthy:
+            raise RuntimeError(f"数据库 {database} 没有可用的实例")
+        return min(healthy, key=Endpoint.score)
+
+    def _mark_down(self, endpoint: Endpoint):
+        endpoint.down_until = time.time() + self.down_seconds
+        metrics.inc("db_endpoint_failures_total", endpoint=endpoint.name)
+
+    def _pool(self, endpoint: Endpoint, database: str):
+        key = (endpoint.name, database)
+        with self._lock:
+            entry = self._pools.get(key)
+            if entry is not None:
+                return entry
+            key_lock = self._pool_locks.setdefault(key, threading.Lock())
+        # 建池需要建立 pool_size 个连接，只串行化同一个 (实例, 库)，不阻塞其他实例的借还
+        with key_lock:
+            entry = self._pools.get(key)
+            if entry is not None:
+                return entry
+            from mysql.connector import pooling
+
+            pool_name = re.sub(r"[^a-zA-Z0-9._:\-*$#]", "_", f"{endpoint.name}.{database}")[:64]
+            pool = pooling.MySQLConnectionPool(
+                pool_name=pool_name, pool_size=self.pool_size, database=database,
+                **self._connect_config(endpoint),
+            )
+            entry = (pool, threading.BoundedSemaphore(self.pool_size))
+            with self._lock:
+                self._pools[key] = entry
+            metrics.inc("db_connections_opened_total", self.pool_size, endpoint=endpoint.name)
+            metrics.set_gauge("db_pool_size", self.pool_size, endpoint=endpoint.name, database=database)
+            return entry
+
+    @contextmanager
+    def connection(self, database: str = None, read_only: bool = False):
+        """借出一个路由后的连接，块结束时归还；返回 (endpoint, connection)。
+        实例连接失败时标记为不健康并尝试下一个候选实例，库不存在、无权限等错误直接抛出"""
+        import mysql.connector
+
+        database = database or self.default_database
+        tried = set()
+        while True:
+            endpoint = self.choose(database, read_only, exclude=tried)
+            start = time.perf_counter()
+            slots = None
+            try:
+                pool, slots = self._pool(endpoint, database)
+                slots.acquire()
+                conn = pool.get_connection()
+            except mysql.connector.Error as e:
+                if slots is not None:
+                    slots.release()
+                if not is_connection_error(e):
+                    raise
+                self._mark_down(endpoint)
+                tried.add(endpoint.name)
+                if len(tried) >= len(self.endpoints_for(database)):
+                    raise
+                continue
+            break
+        metrics.observe("db_pool_wait_seconds", time.perf_counter() - start, endpoint=endpoint.name)
+        with self._lock:
+            endpoint.inflight += 1
+            metrics.set_gauge("db_pool_in_use", endpoint.inflight, endpoint=endpoint.name)
+        start = time.perf_counter()
+        try:
+            yield endpoint, conn
+        finally:
+            endpoint.observe(time.perf_counter() - start)
+            with self._lock:
+                endpoint.inflight -= 1
+                metrics.set_gauge("db_pool_in_use", endpoint.inflight, endpoint=endpoint.name)
+            try:
+                conn.close()
+            finally:
+                slots.release()
+
+    def status(self) -> list:
+        """各实例的角色、健康状态、延迟和进行中请求数"""
+        return [
+            {
+                "name": e.name, "role": e.role, "healthy": e.healthy,
+                "latency_ms": round(e.latency * 1000, 2) if e.latency is not None else None,
+                "inflight": e.inflight,
+            }
+            for e in self.endpoints.values()
+        ]
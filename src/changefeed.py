@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# changefeed.py - 基于高水位轮询的增量变更捕获
+#
+# 爬虫写入的评论、视频主键单调递增，定期查询 主键 > 高水位 的行即可得到新增数据，
+# 不需要开启 binlog。每次发现新数据追加一条变更记录（主键区间、行数、时间）并通知订阅者，
+# 订阅者据此让派生数据（列统计缓存等）失效。只捕获新增行，不捕获对已有行的修改和删除。
+import json
+import os
+import threading
+import time
+
+from src.metrics import metrics
+
+# 评论表、视频表的表名（摘要等工具共用）
+COMMENT_TABLE = os.getenv("COMMENT_TABLE", "comments")
+VIDEO_TABLE = os.getenv("VIDEO_TABLE", "video")
+# 表名 -> 单调递增的高水位列
+DEFAULT_TABLES = {COMMENT_TABLE: "comment_id", VIDEO_TABLE: "video_id"}
+
+
+class ChangeFeed:
+    """按表维护高水位和变更记录；connect() 需返回一个产出数据库连接的上下文管理器"""
+
+    def __init__(self, connect, tables: dict = None, path: str = ".cache/changefeed.json", max_log: int = 1000):
+        self.connect = connect
+        self.tables = dict(tables or DEFAULT_TABLES)
+        self.path = path
+        # 每张表最多保留的变更记录条数
+        self.max_log = max_log
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._thread = None
+        self._stop = threading.Event()
+        # 表名 -> {"baseline": 首次轮询时的高水位, "high_water": 当前高水位, "log": [变更记录]}
+        self._state = {}
+        # 表名 -> 最近一次轮询失败的错误信息，轮询成功后清除
+        self.errors = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._state = json.load(f)
+            except (OSError, ValueError):
+                self._state = {}
+
+    def subscribe(self, callback):
+        """注册回调 callback(table, change)，返回取消订阅的函数"""
+        with self._lock:
+            self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def column(self, table: str) -> str:
+        if table not in self.tables:
+            raise ValueError(f"不支持的表: {table}，可选 {', '.join(self.tables)}")
+        return self.tables[table]
+
+    def poll(self) -> list:
+        """查询各表高水位之后的新数据，返回本次产生的变更记录；单张表出错只记录到 errors，不影响其他表"""
+        changes = []
+        with self._lock, self.connect() as conn:
+            for table, column in self.tables.items():
+                try:
+                    change = self._poll_table(conn, table, column)
+                except Exception as e:
+                    self.errors[table] = str(e)
+                    metrics.inc("changefeed_poll_errors_total", table=table)
+                    continue
+                self.errors.pop(table, None)
+                if change:
+                    changes.append(change)
+            self._save()
+        for change in changes:
+            for callback in list(self._subscribers):
+                try:
+                    callback(change["table"], change)
+                except Exception:
+                    metrics.inc("changefeed_subscriber_errors_total", table=change["table"])
+        return changes
+
+    def _poll_table(self, conn, table: str, column: str):
+        cursor = conn.cursor(dictionary=True)
+        try:
+            state = self._state.get(table)
+            if state is None:
+                # 首次轮询只记录基线，之前的数据不算变更
+                cursor.execute(f"SELECT MAX(`{column}`) AS hi FROM `{table}`")
+                hi = cursor.fetchone()["hi"]
+                self._state[table] = {"baseline": hi, "high_water": hi, "log": []}
+                return None
+            if state["high_water"] is None:
+                cursor.execute(f"SELECT MAX(`{column}`) AS hi, COUNT(*) AS n FROM `{table}`")
+            else:
+                cursor.execute(
+                    f"SELECT MAX(`{column}`) AS hi, COUNT(*) AS n FROM `{table}` WHERE `{column}` > %s",
+                    (state["high_water"],),
+                )
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        if not row["n"]:
+            return None
+        change = {
+            "table": table, "from": state["high_water"], "to": row["hi"],
+            "rows": row["n"], "time": time.time(),
+        }
+        state["high_water"] = row["hi"]
+        state["log"] = (state["log"] + [change])[-self.max_log:]
+        metrics.inc("changefeed_rows_total", row["n"], table=table)
+        return change
+
+    def cursor(self, table: str, cursor=None):
+        """cursor 为空时从首次轮询的基线开始，即返回本服务开始跟踪以来新增的行"""
+        self.column(table)
+        if cursor is not None:
+            return cursor
+        state = self._state.get(table) or {}
+        return state.get("baseline")
+
+    def high_water(self, table: str):
+        return (self._state.get(table) or {}).get("high_water")
+
+    def log(self, table: str, since: float = None) -> list:
+        """返回表的变更记录，since 为时间戳时只返回之后的记录"""
+        self.column(table)
+        entries = (self._state.get(table) or {}).get("log", [])
+        return [e for e in entries if since is None or e["time"] > since]
+
+    def start(self, interval: float = 60):
+        """启动后台轮询线程，重复调用无副作用"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(interval,), name="changefeed", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, interval: float):
+        # 启动后立即轮询一次记录基线
+        while True:
+            try:
+                self.poll()
+            except Exception:
+                metrics.inc("changefeed_poll_errors_total")
+            if self._stop.wait(interval):
+                return
+
+    def _save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, ensure_ascii=False, default=str)
+        os.replace(tmp, self.path)
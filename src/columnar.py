@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# columnar.py - 游标结果直接解码为列式数组（替代 pd.read_sql + 原生连接）
+#
+# pd.read_sql 对非 SQLAlchemy 连接走的是不受支持的 DBAPI 路径，先生成整表的 Python 元组，
+# 再推断出大量 object 列。这里按批 fetchmany，每批按列转置后直接构造定长 NumPy 数组：
+#   整数 -> int64（含 NULL 时为 pandas 可空 Int64）；BIGINT UNSIGNED -> uint64（可空 UInt64）
+#   浮点 -> float64
+#   DECIMAL -> 小数位为 0 时（如 SUM(整数列)）按整数处理，否则保留精确的 Decimal 对象
+#   DATE/DATETIME/TIMESTAMP -> datetime64
+#   其余 -> object
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 10000
+# 单次查询结果的默认内存上限
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class ResultTooLarge(Exception):
+    """查询结果超过内存上限"""
+
+
+def _column_kinds(description) -> list:
+    """根据游标的 description 推断每列的目标类型"""
+    from mysql.connector import FieldFlag, FieldType
+
+    int_types = {FieldType.TINY, FieldType.SHORT, FieldType.INT24, FieldType.LONG, FieldType.LONGLONG, FieldType.YEAR}
+    float_types = {FieldType.FLOAT, FieldType.DOUBLE}
+    decimal_types = {FieldType.DECIMAL, FieldType.NEWDECIMAL}
+    datetime_types = {FieldType.DATE, FieldType.DATETIME, FieldType.TIMESTAMP}
+    kinds = []
+    for column in description:
+        type_code = column[1]
+        if type_code == FieldType.LONGLONG and len(column) > 7 and column[7] & FieldFlag.UNSIGNED:
+            # BIGINT UNSIGNED 可能超出 int64 范围
+            kinds.append("uint")
+        elif type_code in int_types:
+            kinds.append("int")
+        elif type_code in float_types:
+            kinds.append("float")
+        elif type_code in decimal_types:
+            kinds.append("decimal")
+        elif type_code in datetime_types:
+            kinds.append("datetime")
+        else:
+            kinds.append("object")
+    return kinds
+
+
+def _to_array(kind: str, values: tuple):
+    """把一列 Python 值转换为类型化数组"""
+    n = len(values)
+    if kind == "int":
+        mask = np.fromiter((v is None for v in values), dtype=bool, count=n)
+        try:
+            data = np.fromiter((0 if v is None else v for v in values), dtype=np.int64, count=n)
+        except OverflowError:
+            # BIGINT UNSIGNED 超出 int64 范围时退回 object
+            return np.array(values, dtype=object)
+        if mask.any():
+            return pd.arrays.IntegerArray(data, mask)
+        return data
+    if kind == "uint":
+        mask = np.fromiter((v is None for v in values), dtype=bool, count=n)
+        data = np.fromiter((0 if v is None else v for v in values), dtype=np.uint64, count=n)
+        if mask.any():
+            return pd.arrays.IntegerArray(data, mask)
+        return data
+    if kind == "decimal":
+        # MySQL 按列的小数位数返回 Decimal（如 DECIMAL(10,2) 的 5 返回 5.00），指数 >= 0 即小数位为 0
+        if any(v is not None for v in values) and all(v is None or v.as_tuple().exponent >= 0 for v in values):
+            return _to_array("int", tuple(None if v is None else int(v) for v in values))
+        kind = "object"
+    if kind == "float":
+        return np.fromiter((np.nan if v is None else float(v) for v in values), dtype=np.float64, count=n)
+    if kind == "datetime":
+        try:
+            return np.array([np.datetime64("NaT") if v is None else v for v in values], dtype="datetime64[us]")
+        except (TypeError, ValueError):
+            # 超出 datetime64 表示范围等无法转换的值，退回 object
+            return np.array(values, dtype=object)
+    array = np.empty(n, dtype=object)
+    array[:] = values
+    return array
+
+
+def _frame_bytes(frame: pd.DataFrame) -> int:
+    """估算 DataFrame 占用的内存（object 列按字符串长度估算）"""
+    total = 0
+    for column in frame.columns:
+        series = frame[column]
+        if series.dtype == object:
+            total += sum(len(v) if isinstance(v, (str, bytes, bytearray)) else 8 for v in series.array) + 8 * len(series)
+        else:
+            total += series.array.nbytes
+    return total
+
+
+def iter_frames(conn, sql: str, params: tuple = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """按批执行查询，每批产出一个列式 DataFrame，内存占用与 chunk_size 成正比"""
+    cursor = conn.cursor()
+    finished = False
+    try:
+        cursor.execute(sql, params or ())
+        if cursor.description is None:
+            finished = True
+            return
+        names = [column[0] for column in cursor.description]
+        kinds = _column_kinds(cursor.description)
+        empty = True
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            empty = False
+            columns = zip(*rows)
+            frame = pd.DataFrame(
+                {name: _to_array(kind, values) for name, kind, values in zip(names, kinds, columns)},
+                copy=False,
+            )
+            # 按 cursor.description 推断的列类型，供导出等需要稳定 schema 的调用方使用
+            frame.attrs["kinds"] = dict(zip(names, kinds))
+            yield frame
+        finished = True
+        if empty:
+            frame = pd.DataFrame({name: _to_array(kind, ()) for name, kind in zip(names, kinds)})
+            frame.attrs["kinds"] = dict(zip(names, kinds))
+            yield frame
+    finally:
+        if not finished and conn.unread_result:
+            # 提前结束迭代时丢弃未读结果，保证连接可以继续使用
+            conn.consume_results()
+        cursor.close()
+
+
+def fetch_frame(conn, sql: str, params: tuple = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                max_bytes: int = DEFAULT_MAX_BYTES) -> pd.DataFrame:
+    """执行查询并返回完整的列式 DataFrame，累计内存超过 max_bytes 时抛出 ResultTooLarge"""
+    frames = []
+    total = 0
+    cursor_frames = iter_frames(conn, sql, params, chunk_size)
+    for frame in cursor_frames:
+        total += _frame_bytes(frame)
+        if max_bytes and total > max_bytes:
+            cursor_frames.close()
+            raise ResultTooLarge(f"查询结果超过内存上限 {max_bytes} 字节，请缩小查询范围或使用分批读取")
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True, copy=False)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# export.py - 把查询结果分批写入本地 Parquet/CSV 文件，只返回文件句柄、行数和字段类型
+import contextlib
+import decimal
+import os
+import uuid
+
+import pandas as pd
+
+from src.columnar import DEFAULT_CHUNK_SIZE, iter_frames
+from src.readonly import is_read_only
+
+# 导出文件目录
+EXPORT_DIR = os.getenv("EXPORT_DIR", ".exports")
+
+
+def _arrow_schema(pa, kinds: dict):
+    """按 cursor.description 推断的列类型构造 Arrow schema，不依赖首批数据（首批全为 NULL 的列不会被推断为 null 类型）"""
+    types = {
+        "int": pa.int64(),
+        "uint": pa.uint64(),
+        "float": pa.float64(),
+        # 连接器不返回列的小数位数，用 MySQL DECIMAL 的最大小数位 30 保证精确
+        "decimal": pa.decimal256(76, 30),
+        "datetime": pa.timestamp("us"),
+        "object": pa.string(),
+    }
+    return pa.schema([pa.field(str(name), types[kind]) for name, kind in kinds.items()])
+
+
+def _arrow_column(pa, series, field):
+    """把一列转换为 schema 指定类型的 Arrow 数组"""
+    if pa.types.is_decimal(field.type):
+        # 小数位为 0 的 DECIMAL 批次已被解码为整数，统一转回 Decimal
+        values = [
+            None if v is None or v is pd.NA else v if isinstance(v, decimal.Decimal) else decimal.Decimal(int(v))
+            for v in series.array
+        ]
+        return pa.array(values, type=field.type)
+    if pa.types.is_string(field.type):
+        values = [
+            None if v is None else v if isinstance(v, str)
+            else v.decode("utf-8", "replace") if isinstance(v, (bytes, bytearray)) else str(v)
+            for v in series.array
+        ]
+        return pa.array(values, type=field.type)
+    return pa.array(series, type=field.type, from_pandas=True)
+
+
+def export_query(conn, sql: str, params: tuple = None, fmt: str = "parquet",
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, directory: str = EXPORT_DIR) -> dict:
+    """执行只读查询并按批写入文件，内存占用只与 chunk_size 有关"""
+    if not is_read_only(sql):
+        raise ValueError("只允许导出单条只读查询（SELECT/SHOW/DESCRIBE/EXPLAIN/WITH）")
+    if fmt not in ("parquet", "csv"):
+        raise ValueError(f"不支持的导出格式: {fmt}，可选 parquet / csv")
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("导出 Parquet 需要安装 pyarrow，或改用 csv 格式")
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.abspath(os.path.join(directory, f"{uuid.uuid4().hex}.{fmt}"))
+    row_count = 0
+    schema = None
+    writer = None
+    try:
+        with open(path, "wb") as f:
+            try:
+                for frame in iter_frames(conn, sql, params, chunk_size):
+                    if schema is None:
+                        schema = [{"name": str(name), "dtype": str(dtype)} for name, dtype in frame.dtypes.items()]
+                    if fmt == "parquet":
+                        if writer is None:
+                            writer = pq.ParquetWriter(f, _arrow_schema(pa, frame.attrs["kinds"]))
+                        # 每批按同一个 schema 转换，列类型在批次间保持一致
+                        table = pa.Table.from_arrays(
+                            [_arrow_column(pa, frame.iloc[:, i], field) for i, field in enumerate(writer.schema)],
+                            schema=writer.schema,
+                        )
+                        writer.write_table(table)
+                    else:
+                        frame.to_csv(f, header=row_count == 0, index=False, encoding="utf-8")
+                    row_count += len(frame)
+                if writer is not None:
+                    writer.close()
+                    writer = None
+            finally:
+                if writer is not None:
+                    # 导出失败时在文件关闭前关闭写入器，忽略关闭本身的错误，保留原始异常
+                    with contextlib.suppress(Exception):
+                        writer.close()
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return {
+        "handle": path,
+        "format": fmt,
+        "row_count": row_count,
+        "schema": schema or [],
+        "bytes": os.path.getsize(path),
+    }
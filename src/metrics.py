@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+# metrics.py - 指标采集（工具耗时、数据库往返、LLM用量）与调用时间线
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# 默认的耗时分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# 当前对话轮次，用于把同一轮的工具调用/数据库往返/LLM调用串成一条时间线
+current_turn = contextvars.ContextVar("current_turn", default=None)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: tuple) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in key) + "}"
+
+
+class Histogram:
+    """累积分桶直方图"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def to_dict(self) -> dict:
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = self.count
+        return {"count": self.count, "sum": self.sum, "buckets": cumulative}
+
+
+class Metrics:
+    """进程内指标注册表：计数器、仪表、直方图，以及 Chrome trace 格式的时间线"""
+
+    def __init__(self, max_trace_events: int = 10000):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.trace_events = deque(maxlen=max_trace_events)
+        self._epoch = time.perf_counter()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """计数器累加"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """设置仪表当前值"""
+        with self._lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """记录一次直方图观测值"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def add_trace_event(self, name: str, start: float, duration: float, **args):
+        """追加一条时间线事件（start 为 perf_counter 时间）"""
+        turn = current_turn.get()
+        if turn is not None:
+            args.setdefault("turn", turn)
+        self.trace_events.append({
+            "name": name,
+            "ph": "X",
+            "ts": (start - self._epoch) * 1e6,
+            "dur": duration * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        })
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """统计代码块耗时，写入 {name}_seconds 直方图和时间线，异常时累加 {name}_errors_total"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.observe(f"{name}_seconds", duration, **labels)
+            self.add_trace_event(labels.get("tool") or name, start, duration, category=name, **labels)
+
+    @contextmanager
+    def turn(self, turn_id):
+        """标记当前对话轮次，块内产生的时间线事件都会带上该轮次"""
+        token = current_turn.set(turn_id)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_trace_event("turn", start, time.perf_counter() - start, category="turn")
+            current_turn.reset(token)
+
+    def record_llm_usage(self, input_tokens: int, output_tokens: int, latency: float, model: str = ""):
+        """记录一轮LLM调用的token用量和耗时"""
+        self.inc("llm_input_tokens_total", input_tokens or 0, model=model)
+        self.inc("llm_output_tokens_total", output_tokens or 0, model=model)
+        self.observe("llm_turn_seconds", latency, model=model)
+        self.add_trace_event(
+            "llm", time.perf_counter() - latency, latency,
+            category="llm", input_tokens=input_tokens, output_tokens=output_tokens,
+        )
+
+    def cache_ratio(self, cache: str) -> float:
+        """缓存命中率（cache_hits_total / (hits + misses)）"""
+        key = _label_key({"cache": cache})
+        hits = self.counters.get(("cache_hits_total", key), 0)
+        misses = self.counters.get(("cache_misses_total", key), 0)
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def to_json(self) -> dict:
+        """导出为JSON结构"""
+        with self._lock:
+            return {
+                "counters": [{"name": n, "labels": dict(k), "value": v} for (n, k), v in self.counters.items()],
+                "gauges": [{"name": n, "labels": dict(k), "value": v} for (n, k), v in self.gauges.items()],
+                "histograms": [{"name": n, "labels": dict(k), **h.to_dict()} for (n, k), h in self.histograms.items()],
+            }
+
+    def to_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            for (name, key), value in sorted(self.counters.items()):
+                lines.append(f"{name}{_format_labels(key)} {value}")
+            for (name, key), value in sorted(self.gauges.items()):
+                lines.append(f"{name}{_format_labels(key)} {value}")
+            for (name, key), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                for bound, count in histogram.to_dict()["buckets"].items():
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', bound),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def trace(self, turn=None) -> dict:
+        """导出 Chrome trace 格式的时间线（可用 chrome://tracing 或 Perfetto 打开），可按轮次过滤"""
+        events = [e for e in list(self.trace_events) if turn is None or e["args"].get("turn") == turn]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, directory: str = ".logs"):
+        """把指标和时间线写入目录下的 metrics.json / trace.json"""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "metrics.json"), "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, ensure_ascii=False, indent=2)
+        with open(os.path.join(directory, "trace.json"), "w", encoding="utf-8") as f:
+            json.dump(self.trace(), f, ensure_ascii=False, default=str)
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """后台线程启动 HTTP 端点：/metrics 为 Prometheus 文本，/metrics.json 为JSON，/trace 为时间线"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(registry.to_json(), ensure_ascii=False), "application/json"
+                elif self.path == "/trace":
+                    body, content_type = json.dumps(registry.trace(), default=str), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+def estimate_bytes(rows) -> int:
+    """粗略估算结果集的字节数"""
+    total = 0
+    for row in rows:
+        values = row.values() if isinstance(row, dict) else row
+        for value in values:
+            if isinstance(value, (str, bytes, bytearray)):
+                total += len(value)
+            elif value is not None:
+                total += 8
+    return total
+
+
+# 进程级的全局注册表
+metrics = Metrics()
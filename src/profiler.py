@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+# profiler.py - 基于主键区间抽样的列统计（空值率、近似去重数、最值、高频值、直方图）
+#
+# 统计状态都可以合并：增量刷新时只抽样上次之后新增的主键区间，再与已有状态合并。
+import datetime
+import decimal
+import hashlib
+import random
+import time
+from collections import Counter
+
+# KMV 近似去重计数保留的最小哈希个数
+KMV_SIZE = 256
+# 高频值候选最多保留的个数
+TOP_CAPACITY = 100
+HISTOGRAM_BINS = 10
+# 超过该长度的文本不参与高频值统计
+MAX_TOP_VALUE_LENGTH = 64
+
+NUMERIC_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint"}
+
+
+def _normalize(value):
+    """统一值的类型，保证缓存反序列化后仍可比较：数字保持数字，TIME 转秒数，日期转 ISO 字符串，
+    二进制保持 bytes，其余转字符串"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime.datetime) else value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    return str(value)
+
+
+def _hash(value) -> int:
+    return int.from_bytes(hashlib.blake2b(repr(value).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class ColumnProfile:
+    """单列的可合并统计状态"""
+
+    def __init__(self, state: dict = None):
+        state = state or {}
+        self.count = state.get("count", 0)
+        self.nulls = state.get("nulls", 0)
+        self.min = state.get("min")
+        self.max = state.get("max")
+        self.kmv = sorted(state.get("kmv", []))
+        self.top = Counter(state.get("top", {}))
+        self.edges = state.get("edges")
+        self.bins = state.get("bins")
+
+    def update(self, values: list):
+        numeric = []
+        for raw in values:
+            self.count += 1
+            value = _normalize(raw)
+            if value is None:
+                self.nulls += 1
+                continue
+            if isinstance(value, bytes):
+                # 二进制值只参与去重计数，不进入最值和高频值
+                self._add_hash(_hash(value))
+                continue
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+            self._add_hash(_hash(value))
+            if not isinstance(value, str) or len(value) <= MAX_TOP_VALUE_LENGTH:
+                self.top[value if isinstance(value, str) else str(value)] += 1
+            if isinstance(value, (int, float)):
+                numeric.append(value)
+        if len(self.top) > TOP_CAPACITY:
+            self.top = Counter(dict(self.top.most_common(TOP_CAPACITY)))
+        if numeric:
+            self._update_histogram(numeric)
+
+    def _add_hash(self, h: int):
+        if len(self.kmv) < KMV_SIZE:
+            if h not in self.kmv:
+                self.kmv.append(h)
+                self.kmv.sort()
+        elif h < self.kmv[-1] and h not in self.kmv:
+            self.kmv[-1] = h
+            self.kmv.sort()
+
+    def _update_histogram(self, numeric: list):
+        if self.edges is None:
+            # 首次抽样确定分桶边界，之后增量数据落在边界外的计入两端的桶
+            low, high = min(numeric), max(numeric)
+            width = (high - low) / HISTOGRAM_BINS or 1
+            self.edges = [low + width * i for i in range(HISTOGRAM_BINS + 1)]
+            self.bins = [0] * HISTOGRAM_BINS
+        low, width = self.edges[0], (self.edges[-1] - self.edges[0]) / HISTOGRAM_BINS or 1
+        for value in numeric:
+            index = min(max(int((value - low) / width), 0), HISTOGRAM_BINS - 1)
+            self.bins[index] += 1
+
+    def approx_distinct(self) -> int:
+        """KMV 估计抽样数据中的去重值个数"""
+        if len(self.kmv) < KMV_SIZE:
+            return len(self.kmv)
+        return int((KMV_SIZE - 1) / (self.kmv[-1] / 2 ** 64))
+
+    def state(self) -> dict:
+        return {
+            "count": self.count, "nulls": self.nulls, "min": self.min, "max": self.max,
+            "kmv": self.kmv, "top": dict(self.top), "edges": self.edges, "bins": self.bins,
+        }
+
+    def summary(self, top_n: int = 10) -> dict:
+        return {
+            "null_rate": round(self.nulls / self.count, 4) if self.count else None,
+            "approx_distinct": self.approx_distinct(),
+            "min": self.min,
+            "max": self.max,
+            "top_values": self.top.most_common(top_n),
+            "histogram": {"edges": self.edges, "counts": self.bins} if self.edges else None,
+        }
+
+
+def _primary_key(cursor, database: str, table: str):
+    """返回整数类型的单列主键名，没有则返回 None"""
+    cursor.execute(
+        """
+        SELECT k.column_name AS name, c.data_type AS type
+        FROM information_schema.key_column_usage k
+        JOIN information_schema.columns c
+          ON c.table_schema = k.table_schema AND c.table_name = k.table_name AND c.column_name = k.column_name
+        WHERE k.table_schema = %s AND k.table_name = %s AND k.constraint_name = 'PRIMARY'
+        ORDER BY k.ordinal_position
+        """,
+        (database, table),
+    )
+    rows = cursor.fetchall()
+    if len(rows) == 1 and rows[0]["type"].lower() in NUMERIC_TYPES:
+        return rows[0]["name"]
+    return None
+
+
+def profile_table(conn, database: str, table: str, state: dict = None,
+                  ranges: int = 8, range_size: int = 500) -> dict:
+    """抽样若干主键区间计算列统计，state 为上次的结果时只抽样新增的主键区间并合并"""
+    state = dict(state or {})
+    cursor = conn.cursor(dictionary=True)
+    try:
+        pk = state.get("pk") or _primary_key(cursor, database, table)
+        columns = {name: ColumnProfile(s) for name, s in (state.get("columns") or {}).items()}
+        rows = []
+        if pk:
+            cursor.execute(f"SELECT MIN(`{pk}`) AS lo, MAX(`{pk}`) AS hi FROM `{table}`")
+            bounds = cursor.fetchone()
+            lo = state["max_pk"] + 1 if state.get("max_pk") is not None else bounds["lo"]
+            hi = bounds["hi"]
+            if lo is not None and hi is not None and hi >= lo:
+                if hi - lo + 1 <= ranges * range_size:
+                    starts = [lo]
+                    range_size = hi - lo + 1
+                else:
+                    # 分层抽样：把区间等分为 ranges 段，每段内随机取一个互不重叠的子区间
+                    stratum = (hi - lo + 1) // ranges
+                    starts = [lo + i * stratum + random.randint(0, stratum - range_size) for i in range(ranges)]
+                for start in starts:
+                    cursor.execute(f"SELECT * FROM `{table}` WHERE `{pk}` >= %s AND `{pk}` < %s", (start, start + range_size))
+                    rows.extend(cursor.fetchall())
+                state["max_pk"] = hi
+        elif not state:
+            # 没有整数主键时只取前若干行
+            cursor.execute(f"SELECT * FROM `{table}` LIMIT %s", (ranges * range_size,))
+            rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    if rows:
+        for name in rows[0]:
+            columns.setdefault(name, ColumnProfile()).update([row[name] for row in rows])
+    state.update(
+        pk=pk,
+        rows_sampled=state.get("rows_sampled", 0) + len(rows),
+        columns={name: profile.state() for name, profile in columns.items()},
+        updated_at=time.time(),
+    )
+    return state
+
+
+def summarize_profile(state: dict, top_n: int = 10) -> dict:
+    """把统计状态转换为给 Agent 看的摘要"""
+    return {
+        "primary_key": state.get("pk"),
+        "rows_sampled": state.get("rows_sampled", 0),
+        "updated_at": state.get("updated_at"),
+        "columns": {name: ColumnProfile(s).summary(top_n) for name, s in state.get("columns", {}).items()},
+    }
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# querylog.py - 队列化日志和SQL指纹统计
+#
+# 日志记录只把消息放入内存队列，由后台线程写文件，调用方不做磁盘 IO；
+# SQL 去掉字面量后得到指纹，按指纹汇总次数和耗时，只有慢查询和抽样命中的语句写日志。
+import atexit
+import hashlib
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from src.metrics import metrics
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# 从左到右同时匹配字符串、注释和数字字面量，避免字符串中的 -- 被当作注释
+_TOKENS = re.compile(
+    r"(?P<comment>/\*.*?\*/|--[^\n]*|#[^\n]*)"
+    r"|'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|`[^`]*`"
+    r"|\b0x[0-9a-f]+\b|(?<![\w`])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b",
+    re.IGNORECASE | re.DOTALL,
+)
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_LISTS = re.compile(r"(\(\?\))(?:\s*,\s*\(\?\))+")
+_SPACES = re.compile(r"\s+")
+
+
+def setup_logging(name: str, path: str = None, level: int = logging.INFO,
+                  stderr_level: int = logging.WARNING) -> logging.Logger:
+    """配置 name 日志器：QueueHandler 入队，QueueListener 在后台线程写文件；stderr 只输出 stderr_level 以上的日志。
+    日志器不再向根日志器传播，避免同一行写两次"""
+    log_queue = queue.SimpleQueue()
+    handlers = []
+    if path:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        file_handler = logging.FileHandler(path, encoding="utf-8")
+        file_handler.setLevel(level)
+        handlers.append(file_handler)
+    stderr_handler = logging.StreamHandler()
+    stderr_handler.setLevel(stderr_level)
+    handlers.append(stderr_handler)
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # 退出时写完队列中剩余的日志
+    atexit.register(listener.stop)
+
+    logger = logging.getLogger(name)
+    logger.handlers.clear()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+
+def _replace_token(match) -> str:
+    token = match.group(0)
+    if match.group("comment"):
+        return " "
+    # 反引号标识符保持原样
+    return token if token.startswith("`") else "?"
+
+
+def fingerprint(sql: str) -> str:
+    """去掉注释和字面量，合并 IN 列表、多行 VALUES 和空白，得到语句形状"""
+    text = _TOKENS.sub(_replace_token, sql)
+    text = _IN_LISTS.sub("(?)", text)
+    text = _VALUES_LISTS.sub(r"\1", text)
+    return _SPACES.sub(" ", text).strip().rstrip(";").strip().lower()
+
+
+def fingerprint_id(shape: str) -> str:
+    return hashlib.blake2b(shape.encode("utf-8"), digest_size=6).hexdigest()
+
+
+class QueryLog:
+    """按SQL指纹汇总次数、错误数和耗时；超过 slow_seconds 的语句写 WARNING 日志，其余按 sample_rate 抽样写 INFO"""
+
+    def __init__(self, logger: logging.Logger, slow_seconds: float = 1.0, sample_rate: float = 0.01,
+                 max_fingerprints: int = 1000):
+        self.logger = logger
+        self.slow_seconds = slow_seconds
+        self.sample_rate = sample_rate
+        # 指纹数量上限，超出后的新形状合并到 "other"
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, sql: str, seconds: float, error: Exception = None, rows: int = None):
+        shape = fingerprint(sql)
+        fid = fingerprint_id(shape)
+        with self._lock:
+            stats = self._stats.get(fid)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    fid, shape = "other", "other"
+                    stats = self._stats.get(fid)
+                if stats is None:
+                    stats = self._stats[fid] = {
+                        "fingerprint": shape, "count": 0, "errors": 0, "rows": 0,
+                        "total_seconds": 0.0, "max_seconds": 0.0, "slow": 0,
+                    }
+            stats["count"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["rows"] += rows or 0
+            if error is not None:
+                stats["errors"] += 1
+            slow = seconds >= self.slow_seconds
+            if slow:
+                stats["slow"] += 1
+        metrics.observe("db_statement_seconds", seconds)
+        if slow:
+            metrics.inc("db_slow_queries_total")
+            self.logger.warning(f"慢查询 {seconds * 1000:.0f}ms [{fid}] rows={rows} error={error}: {sql}")
+        elif error is not None or random.random() < self.sample_rate:
+            self.logger.info(f"查询 {seconds * 1000:.0f}ms [{fid}] rows={rows} error={error}: {sql}")
+
+    @contextmanager
+    def track(self, sql: str):
+        """记录块内语句的耗时和是否出错；块内可通过 yield 的字典设置 rows"""
+        info = {"rows": None}
+        start = time.perf_counter()
+        try:
+            yield info
+        except Exception as e:
+            self.record(sql, time.perf_counter() - start, e, info["rows"])
+            raise
+        self.record(sql, time.perf_counter() - start, None, info["rows"])
+
+    def top(self, limit: int = 20, order_by: str = "total_seconds") -> list:
+        """按 total_seconds / count / max_seconds / errors / slow 等字段倒序返回指纹统计"""
+        with self._lock:
+            stats = [{"id": fid, **s} for fid, s in self._stats.items()]
+        for s in stats:
+            s["avg_seconds"] = s["total_seconds"] / s["count"] if s["count"] else 0.0
+        stats.sort(key=lambda s: s.get(order_by, 0), reverse=True)
+        return stats[:limit]
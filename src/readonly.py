@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# readonly.py - 判断SQL是否为单条只读语句
+import re
+from contextlib import contextmanager
+
+READ_ONLY_KEYWORDS = {"SELECT", "SHOW", "DESCRIBE", "DESC", "EXPLAIN", "WITH"}
+
+# 从左到右同时匹配字符串字面量和注释，避免字符串中的 -- 或注释中的引号互相干扰；
+# /*! ... */ 是 MySQL 会执行的版本注释，单独匹配（包括没有闭合的）
+_TOKENS = re.compile(
+    r"(?P<string>'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`)"
+    r"|(?P<executable>/\*!(?:.*?\*/|.*))|(?P<comment>/\*.*?\*/|--[^\n]*|#[^\n]*)",
+    re.DOTALL,
+)
+# 字面量和注释之外的分号是语句分隔符
+_STATEMENT_SPLIT = re.compile(_TOKENS.pattern + r"|(?P<semicolon>;)", re.DOTALL)
+# SELECT ... INTO（OUTFILE/DUMPFILE/@变量）和加锁子句都不是纯读取
+_WRITE_CLAUSES = re.compile(r"\b(INTO|FOR\s+UPDATE|FOR\s+SHARE|LOCK\s+IN\s+SHARE\s+MODE)\b", re.IGNORECASE)
+_EXPLAIN_ANALYZE = re.compile(r"(?:EXPLAIN|DESCRIBE|DESC)\s+ANALYZE\b(?:\s+FORMAT\s*=\s*\w+)?(.*)", re.IGNORECASE | re.DOTALL)
+# WITH 之后括号外出现的第一个语句关键字决定语句类型
+_STATEMENT_WORDS = re.compile(r"[()]|\b(SELECT|INSERT|UPDATE|DELETE|REPLACE|TABLE|VALUES)\b", re.IGNORECASE)
+
+
+def _main_keyword(stripped: str) -> str:
+    """返回 CTE 列表之后的主语句关键字，例如 WITH x AS (SELECT 1) DELETE FROM t 返回 DELETE"""
+    depth = 0
+    for match in _STATEMENT_WORDS.finditer(stripped):
+        token = match.group(0)
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0:
+            return token.upper()
+    return ""
+
+
+def split_statements(sql: str) -> list:
+    """按字面量和注释之外的分号切分多条语句，返回去掉分号和首尾空白后的非空语句"""
+    statements, start = [], 0
+    for match in _STATEMENT_SPLIT.finditer(sql):
+        if match.group("semicolon"):
+            statements.append(sql[start:match.start()])
+            start = match.end()
+    statements.append(sql[start:])
+    return [s.strip() for s in statements if s.strip()]
+
+
+def is_read_only(sql: str) -> bool:
+    """只允许单条 SELECT/SHOW/DESCRIBE/EXPLAIN 语句或主语句为 SELECT 的 WITH 语句，且不含 INTO、加锁子句。
+    含 /*! ... */ 可执行注释的语句一律拒绝"""
+    if any(m.group("executable") for m in _TOKENS.finditer(sql)):
+        return False
+    stripped = _TOKENS.sub(lambda m: "''" if m.group("string") else " ", sql).strip().rstrip(";").strip()
+    if not stripped or ";" in stripped:
+        return False
+    keyword = stripped.split(None, 1)[0].upper()
+    if keyword not in READ_ONLY_KEYWORDS:
+        return False
+    if keyword == "WITH" and _main_keyword(stripped) != "SELECT":
+        return False
+    analyze = _EXPLAIN_ANALYZE.match(stripped)
+    if analyze:
+        # EXPLAIN ANALYZE 会真正执行被分析的语句
+        return is_read_only(analyze.group(1))
+    return not _WRITE_CLAUSES.search(stripped)
+
+
+@contextmanager
+def read_only_transaction(conn, read_only: bool = True):
+    """在只读事务中执行，结束时回滚：每次查询读取新的快照，写语句会被 MySQL 拒绝。
+    read_only=False 时开启普通事务，结束时同样回滚，写语句不会提交"""
+    conn.start_transaction(readonly=read_only)
+    try:
+        yield conn
+    finally:
+        if conn.unread_result:
+            conn.consume_results()
+        conn.rollback()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# schema_cache.py - 表结构与列统计缓存（带过期时间，持久化到本地 JSON 文件）
+import json
+import os
+import threading
+import time
+
+from src.metrics import metrics
+
+
+class SchemaCache:
+    """按 (类别, 表名) 缓存表结构、列统计等元数据"""
+
+    def __init__(self, path: str = ".cache/schema_cache.json", ttl: float = 600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    @staticmethod
+    def _key(kind: str, table: str) -> str:
+        return f"{kind}:{table}"
+
+    def get(self, kind: str, table: str, allow_stale: bool = False):
+        """读取缓存，过期时返回 None；allow_stale=True 时忽略过期时间（用于增量刷新）"""
+        with self._lock:
+            entry = self._entries.get(self._key(kind, table))
+        if entry is None or (not allow_stale and time.time() - entry["time"] > self.ttl):
+            metrics.inc("cache_misses_total", cache=kind)
+            return None
+        metrics.inc("cache_hits_total", cache=kind)
+        return entry["value"]
+
+    def put(self, kind: str, table: str, value):
+        with self._lock:
+            self._entries[self._key(kind, table)] = {"time": time.time(), "value": value}
+            self._save()
+
+    def expired(self, kind: str, table: str) -> bool:
+        """缓存不存在或已过期"""
+        with self._lock:
+            entry = self._entries.get(self._key(kind, table))
+        return entry is None or time.time() - entry["time"] > self.ttl
+
+    def expire(self, table: str, kind: str = None):
+        """把指定表的缓存标记为过期但保留内容，供增量刷新使用"""
+        with self._lock:
+            for key, entry in self._entries.items():
+                entry_kind, _, entry_table = key.partition(":")
+                if entry_table == table and (kind is None or entry_kind == kind):
+                    entry["time"] = 0
+            self._save()
+
+    def invalidate(self, table: str = None, kind: str = None):
+        """删除指定表（或全部）的缓存"""
+        with self._lock:
+            for key in list(self._entries):
+                entry_kind, _, entry_table = key.partition(":")
+                if (table is None or entry_table == table) and (kind is None or entry_kind == kind):
+                    del self._entries[key]
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False, default=str)
+        os.replace(tmp, self.path)
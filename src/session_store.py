@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+# session_store.py - 基于 SQLite 的持久化会话服务（ADK BaseSessionService 实现）
+#
+# InMemorySessionService 会把所有会话和事件常驻内存，重启即丢失。这里把会话和事件写入本地 SQLite，
+# 内存中只按 LRU 保留最近使用的会话；每个会话只保留最近 max_events 条事件，
+# 较早事件中的大体积工具返回值会被压缩为预览文本。
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+try:
+    from google.adk.errors.already_exists_error import AlreadyExistsError
+except ImportError:
+    AlreadyExistsError = ValueError
+
+from src.metrics import metrics
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    last_update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    compacted INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_session ON events (app_name, user_id, session_id, seq);
+"""
+
+
+def compact_event_data(data: str, max_payload_chars: int) -> str:
+    """把事件中超长的工具返回值替换为截断后的预览"""
+    event = json.loads(data)
+    parts = (event.get("content") or {}).get("parts") or []
+    for part in parts:
+        for key in ("function_response", "functionResponse"):
+            response = part.get(key)
+            if not response or "response" not in response:
+                continue
+            payload = json.dumps(response["response"], ensure_ascii=False, default=str)
+            if len(payload) > max_payload_chars:
+                response["response"] = {"compacted": True, "preview": payload[:max_payload_chars]}
+    return json.dumps(event, ensure_ascii=False)
+
+
+class SqliteSessionService(BaseSessionService):
+    """SQLite 持久化 + 内存 LRU 的会话服务"""
+
+    def __init__(self, db_path: str = ".sessions/sessions.db", max_cached_sessions: int = 256,
+                 max_events: int = 200, compact_after: int = 20, max_payload_chars: int = 2000):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_cached_sessions = max_cached_sessions
+        self.max_events = max_events
+        self.compact_after = compact_after
+        self.max_payload_chars = max_payload_chars
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    # ---- 内存 LRU ----
+    def _cache_get(self, key):
+        session = self._cache.get(key)
+        if session is None:
+            metrics.inc("cache_misses_total", cache="session")
+            return None
+        metrics.inc("cache_hits_total", cache="session")
+        self._cache.move_to_end(key)
+        return session
+
+    def _cache_put(self, key, session: Session):
+        self._cache[key] = session
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cached_sessions:
+            # 冷会话只从内存淘汰，数据仍在 SQLite 中
+            self._cache.popitem(last=False)
+        metrics.set_gauge("sessions_cached", len(self._cache))
+
+    def _load(self, app_name: str, user_id: str, session_id: str):
+        row = self._db.execute(
+            "SELECT state, last_update_time FROM sessions WHERE app_name=? AND user_id=? AND id=?",
+            (app_name, user_id, session_id),
+        ).fetchone()
+        if row is None:
+            return None
+        events = [
+            Event.model_validate_json(data)
+            for (data,) in self._db.execute(
+                "SELECT data FROM events WHERE app_name=? AND user_id=? AND session_id=? ORDER BY seq",
+                (app_name, user_id, session_id),
+            )
+        ]
+        return Session(
+            id=session_id, app_name=app_name, user_id=user_id,
+            state=json.loads(row[0]), events=events, last_update_time=row[1],
+        )
+
+    # ---- BaseSessionService ----
+    async def create_session(self, *, app_name: str, user_id: str, state=None, session_id=None) -> Session:
+        session_id = (session_id or "").strip() or str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            try:
+                with self._db:
+                    self._db.execute(
+                        "INSERT INTO sessions (app_name, user_id, id, state, last_update_time) VALUES (?, ?, ?, ?, ?)",
+                        (app_name, user_id, session_id, json.dumps(state or {}, ensure_ascii=False, default=str), now),
+                    )
+            except sqlite3.IntegrityError:
+                raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+            session = Session(id=session_id, app_name=app_name, user_id=user_id,
+                              state=dict(state or {}), events=[], last_update_time=now)
+            self._cache_put((app_name, user_id, session_id), session)
+            return session.model_copy(deep=True)
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: GetSessionConfig = None):
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            session = self._cache_get(key)
+            if session is None:
+                session = self._load(app_name, user_id, session_id)
+                if session is None:
+                    return None
+                self._cache_put(key, session)
+            session = session.model_copy(deep=True)
+        if config:
+            if config.num_recent_events:
+                session.events = session.events[-config.num_recent_events:]
+            if config.after_timestamp:
+                session.events = [e for e in session.events if e.timestamp >= config.after_timestamp]
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: str = None) -> ListSessionsResponse:
+        query = "SELECT user_id, id, state, last_update_time FROM sessions WHERE app_name=?"
+        params = [app_name]
+        if user_id is not None:
+            query += " AND user_id=?"
+            params.append(user_id)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return ListSessionsResponse(sessions=[
+            Session(id=sid, app_name=app_name, user_id=uid, state=json.loads(state), events=[], last_update_time=ts)
+            for uid, sid, state, ts in rows
+        ])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        with self._lock:
+            with self._db:
+                self._db.execute("DELETE FROM events WHERE app_name=? AND user_id=? AND session_id=?",
+                                 (app_name, user_id, session_id))
+                self._db.execute("DELETE FROM sessions WHERE app_name=? AND user_id=? AND id=?",
+                                 (app_name, user_id, session_id))
+            self._cache.pop((app_name, user_id, session_id), None)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        event = await super().append_event(session, event)
+        session.last_update_time = event.timestamp
+        key = (session.app_name, session.user_id, session.id)
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    "INSERT INTO events (app_name, user_id, session_id, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+                    (*key, event.timestamp, event.model_dump_json(exclude_none=True)),
+                )
+                self._db.execute(
+                    "UPDATE sessions SET state=?, last_update_time=? WHERE app_name=? AND user_id=? AND id=?",
+                    (json.dumps(session.state, ensure_ascii=False, default=str), session.last_update_time, *key),
+                )
+                self._trim_and_compact(key)
+            cached = self._cache.get(key)
+            if cached is not None and cached is not session:
+                cached.events.append(event.model_copy(deep=True))
+                cached.events = cached.events[-self.max_events:]
+                cached.state = dict(session.state)
+                cached.last_update_time = session.last_update_time
+        return event
+
+    def _trim_and_compact(self, key):
+        """删除超出上限的旧事件，并压缩最近 compact_after 条之前的工具返回值"""
+        self._db.execute(
+            """DELETE FROM events WHERE app_name=? AND user_id=? AND session_id=? AND seq <= (
+                   SELECT seq FROM events WHERE app_name=? AND user_id=? AND session_id=?
+                   ORDER BY seq DESC LIMIT 1 OFFSET ?)""",
+            (*key, *key, self.max_events),
+        )
+        rows = self._db.execute(
+            """SELECT seq, data FROM events WHERE app_name=? AND user_id=? AND session_id=? AND compacted=0
+               AND seq <= (SELECT seq FROM events WHERE app_name=? AND user_id=? AND session_id=?
+                           ORDER BY seq DESC LIMIT 1 OFFSET ?)""",
+            (*key, *key, self.compact_after),
+        ).fetchall()
+        for seq, data in rows:
+            self._db.execute("UPDATE events SET data=?, compacted=1 WHERE seq=?",
+                             (compact_event_data(data, self.max_payload_chars), seq))
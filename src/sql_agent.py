@@ -1,12 +1,11 @@
 # -*- coding: utf-8 -*-
 # sql_agent.py - SQL智能代理
-import mysql.connector
-import pandas as pd
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+# pandas / mysql / langchain / openai 较重，延迟到首次使用时再导入，降低冷启动耗时
 import re
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
+from src.readonly import is_read_only, read_only_transaction, split_statements
 
 load_dotenv()
 import os
@@ -21,12 +20,16 @@ class SQLAgent:
             'password': os.getenv("MYSQL_PASSWORD"),
             'database': os.getenv("MYSQL_DATABASE")
         }
-        self.llm = ChatOpenAI(
-            model="deepseek-chat",
-            openai_api_base="https://api.deepseek.com",
-            openai_api_key=os.getenv("DEEPSEEK_API_KEY"),
-            max_tokens=1024,
-        )
+        # 每个线程复用一个连接
+        self._local = threading.local()
+        # 单次查询结果的内存上限
+        self.max_result_bytes = int(os.getenv("MYSQL_MAX_RESULT_BYTES", 256 * 1024 * 1024))
+        # LLM客户端延迟到首次调用时创建
+        self._llm = None
+        # 并发 EXPLAIN 候选SQL的线程池，延迟创建
+        self._explain_pool = None
+        # 推测模式下一次生成的候选SQL数量
+        self.num_candidates = int(os.getenv("SQL_CANDIDATES", 3))
         
         # 定义数据库模式
         self.schema_info = """
@@ -62,11 +65,27 @@ class SQLAgent:
            - notes (TEXT)
         """
     
-    def process_query(self, user_query):
-        """处理用户自然语言查询"""
+    @property
+    def llm(self):
+        """首次访问时创建LLM客户端"""
+        if self._llm is None:
+            from langchain_openai import ChatOpenAI
+            self._llm = ChatOpenAI(
+                model="deepseek-chat",
+                openai_api_base="https://api.deepseek.com",
+                openai_api_key=os.getenv("DEEPSEEK_API_KEY"),
+                max_tokens=1024,
+            )
+        return self._llm
+
+    def process_query(self, user_query, speculative=False):
+        """处理用户自然语言查询，speculative=True 时一次生成多条候选SQL并选出代价最低的可执行语句"""
         try:
             # 生成SQL查询语句
-            sql_query = self.generate_sql(user_query)
+            if speculative:
+                sql_query = self.select_best_sql(self.generate_sql_candidates(user_query))
+            else:
+                sql_query = self.generate_sql(user_query)
             
             # 执行查询
             result = self.execute_query(sql_query)
@@ -81,6 +100,7 @@ class SQLAgent:
     
     def generate_sql(self, natural_query):
         """将自然语言转换为SQL查询"""
+        from langchain_core.prompts import ChatPromptTemplate
         prompt = ChatPromptTemplate.from_messages([
             ("system", f"你是一个SQL生成助手。根据用户的问题生成相应的MySQL查询语句。数据库模式如下：\n{self.schema_info}\n只返回SQL语句，不要其他内容。"),
             ("human", natural_query)
@@ -101,21 +121,114 @@ class SQLAgent:
             else:
                 return response.content.strip()
     
+    def generate_sql_candidates(self, natural_query, n=None):
+        """一次LLM调用生成多条不同写法的候选SQL"""
+        from langchain_core.prompts import ChatPromptTemplate
+        n = n or self.num_candidates
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", f"你是一个SQL生成助手。根据用户的问题生成{n}条写法不同、结果等价的MySQL查询语句，"
+                       f"例如换用JOIN/子查询、调整过滤和聚合顺序。数据库模式如下：\n{self.schema_info}\n"
+                       f"每条SQL以分号结尾，语句之间用空行分隔，只返回SQL语句，不要其他内容。"),
+            ("human", "{natural_query}")
+        ])
+
+        chain = prompt | self.llm
+        response = chain.invoke({"natural_query": natural_query})
+
+        # 去掉代码块标记和 "1." "2)" 等列表序号后，按字面量之外的分号切分（没有分号时按空行切分），
+        # 每段从 SELECT/WITH 开头的行开始截取，避免 WITH t AS (SELECT ...) SELECT ... 被截成无效片段
+        content = re.sub(r'```(?:sql)?', '', response.content, flags=re.IGNORECASE)
+        content = re.sub(r'^\s*\d+[.)]\s*', '', content, flags=re.MULTILINE)
+        parts = split_statements(content)
+        if parts == [content.strip()]:
+            # 一个分号都没有
+            parts = re.split(r'\n\s*\n', content)
+        candidates = []
+        for part in parts:
+            start = re.search(r'^\s*(SELECT|WITH)\b', part, re.IGNORECASE | re.MULTILINE)
+            if not start:
+                continue
+            sql = part[start.start():].strip().rstrip(';').strip()
+            # 只保留单条只读语句
+            if not is_read_only(sql):
+                continue
+            sql += ';'
+            if sql not in candidates:
+                candidates.append(sql)
+        # 没有解析出候选时退回单条生成
+        return candidates[:n] or [self.generate_sql(natural_query)]
+
+    def explain_cost(self, sql_query):
+        """用 EXPLAIN 估算SQL代价（各步骤扫描行数 × 过滤比例的乘积），SQL无效时抛出异常"""
+        conn = self._get_connection()
+        with read_only_transaction(conn):
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute(f"EXPLAIN {sql_query.rstrip().rstrip(';')}")
+                plan = cursor.fetchall()
+            finally:
+                cursor.close()
+        cost = 1.0
+        for step in plan:
+            rows = step.get("rows") or 1
+            filtered = step.get("filtered") or 100
+            cost *= max(float(rows) * float(filtered) / 100, 1.0)
+        return cost
+
+    def select_best_sql(self, candidates):
+        """并发 EXPLAIN 所有候选SQL，返回代价最低的有效语句；全部无效时抛出第一个错误"""
+        from concurrent.futures import ThreadPoolExecutor
+        if len(candidates) == 1:
+            return candidates[0]
+        if self._explain_pool is None:
+            # 线程复用各自的数据库连接，避免每次都重新建连
+            self._explain_pool = ThreadPoolExecutor(max_workers=self.num_candidates, thread_name_prefix="sql-explain")
+        futures = [self._explain_pool.submit(self.explain_cost, sql) for sql in candidates]
+        valid, errors = [], []
+        for sql, future in zip(candidates, futures):
+            try:
+                valid.append((future.result(), sql))
+            except Exception as e:
+                errors.append(e)
+        if not valid:
+            raise errors[0]
+        return min(valid, key=lambda item: item[0])[1]
+
+    def _get_connection(self):
+        """获取当前线程复用的数据库连接，断开时自动重连"""
+        import mysql.connector
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # 不开启 autocommit：查询在只读事务中执行并回滚，模型生成的写语句不会落库
+            conn = mysql.connector.connect(**self.db_config)
+            self._local.conn = conn
+        else:
+            conn.ping(reconnect=True)
+        return conn
+
     def execute_query(self, sql_query):
         """执行SQL查询"""
+        from src.columnar import fetch_frame
         try:
-            conn = mysql.connector.connect(**self.db_config)
-            df = pd.read_sql(sql_query, conn)
-            conn.close()
-            return df
+            conn = self._get_connection()
+            with read_only_transaction(conn):
+                return fetch_frame(conn, sql_query, max_bytes=self.max_result_bytes)
         except Exception as e:
             raise e
+
+    def iter_query(self, sql_query, chunk_size=10000):
+        """分批执行SQL查询，逐批返回DataFrame"""
+        from src.columnar import iter_frames
+        conn = self._get_connection()
+        with read_only_transaction(conn):
+            yield from iter_frames(conn, sql_query, chunk_size=chunk_size)
     
     def format_result(self, result_df, original_query):
         """格式化查询结果"""
         if result_df.empty:
             return "未找到相关数据"
         
+        from langchain_core.prompts import ChatPromptTemplate
         # 使用AI解释结果
         result_str = result_df.to_string(max_rows=10, max_cols=10)
         
@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 # sql_agent.py - SQL智能代理
-import mysql.connector
-import pandas as pd
-from langchain_core.prompts import ChatPromptTemplate
+# pandas / mysql / langchain 较重，延迟到首次使用时再导入，降低冷启动耗时
 import re
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
+from src.metrics import metrics
+from src.cancellation import QueryTracker
+from src.readonly import read_only_transaction
 
 load_dotenv()
 import os
@@ -20,6 +22,14 @@ class SQLTools:
             'password': os.getenv("MYSQL_PASSWORD"),
             'database': os.getenv("MYSQL_DATABASE")
         }
+        # 每个线程复用一个连接（工具函数可能在线程池中并发执行）
+        self._local = threading.local()
+        # 单次查询结果的内存上限
+        self.max_result_bytes = int(os.getenv("MYSQL_MAX_RESULT_BYTES", 256 * 1024 * 1024))
+        # 跟踪执行中的语句，便于取消时 KILL QUERY
+        self.query_tracker = QueryTracker(self.db_config)
+        # 同时执行的查询数上限（批量模式下多个问题并发时保护数据库）
+        self.db_slots = threading.BoundedSemaphore(int(os.getenv("MYSQL_MAX_CONCURRENCY", 8)))
         
         # 定义数据库模式
         self.schema_info = """
@@ -28,6 +38,7 @@ class SQLTools:
     
     def generate_sql(self, natural_query):
         """将自然语言转换为SQL查询"""
+        from langchain_core.prompts import ChatPromptTemplate
         prompt = ChatPromptTemplate.from_messages([
             ("system", f"你是一个SQL生成助手。根据用户的问题生成相应的MySQL查询语句。数据库模式如下：\n{self.schema_info}\n只返回SQL语句，不要其他内容。"),
             ("human", natural_query)
@@ -51,28 +62,60 @@ class SQLTools:
     def get_all_table_names(self):
         """获取数据库所有表名"""
         df = self.execute_query("SHOW TABLES;")
-        return df['Tables_in_insight'].tolist()
+        # 列名为 Tables_in_<库名>，随配置的库变化，按位置取第一列
+        return df.iloc[:, 0].tolist()
 
     def get_table_schema(self, table_name):
         """获取表的建表语句"""
         df = self.execute_query(f"SHOW CREATE TABLE {table_name};")
         return df['Create Table'][0]
 
+    def _get_connection(self):
+        """获取当前线程复用的数据库连接，断开时自动重连"""
+        import mysql.connector
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # 不开启 autocommit：查询在只读事务中执行并回滚，模型生成的写语句不会落库
+            conn = mysql.connector.connect(**self.db_config)
+            metrics.inc("db_connections_opened_total", source="sql_tools")
+            self._local.conn = conn
+        else:
+            conn.ping(reconnect=True)
+        return conn
+
     def execute_query(self, sql_query):
         """执行SQL查询"""
+        from src.columnar import fetch_frame
         try:
-            conn = mysql.connector.connect(**self.db_config)
-            df = pd.read_sql(sql_query, conn)
-            conn.close()
+            with self.db_slots:
+                conn = self._get_connection()
+                with metrics.timer("db_query", source="sql_tools"), self.query_tracker.track(conn), \
+                        read_only_transaction(conn):
+                    df = fetch_frame(conn, sql_query, max_bytes=self.max_result_bytes)
+            metrics.inc("db_round_trips_total", source="sql_tools")
+            metrics.inc("db_rows_returned_total", len(df), source="sql_tools")
+            metrics.inc("db_bytes_returned_total", int(df.memory_usage(deep=False).sum()), source="sql_tools")
             return df
         except Exception as e:
             raise e
+
+    def iter_query(self, sql_query, chunk_size=10000):
+        """分批执行SQL查询，逐批返回DataFrame"""
+        from src.columnar import iter_frames
+        conn = self._get_connection()
+        with self.query_tracker.track(conn), read_only_transaction(conn):
+            yield from iter_frames(conn, sql_query, chunk_size=chunk_size)
+
+    def cancel_all(self):
+        """终止所有执行中的查询（用户中断时调用）"""
+        return self.query_tracker.cancel_all()
     
     def format_result(self, result_df, original_query):
         """格式化查询结果"""
         if result_df.empty:
             return "未找到相关数据"
         
+        from langchain_core.prompts import ChatPromptTemplate
         # 使用AI解释结果
         result_str = result_df.to_string(max_rows=10, max_cols=10)
         
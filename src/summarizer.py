@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# summarizer.py - 长文本 map-reduce 摘要：按 token 预算分块，并发摘要各块，再逐层合并
+#
+# 分块摘要按内容哈希缓存在本地目录，重复摘要同一视频时只需要最后一次合并调用（或完全命中缓存）。
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+
+from src.metrics import metrics
+
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "deepseek/deepseek-chat")
+SUMMARY_CACHE_DIR = os.getenv("SUMMARY_CACHE_DIR", ".cache/summaries")
+
+MAP_PROMPT = "请用中文概括下面这段{kind}的要点，保留关键事实、数字和观点，不要添加原文没有的信息：\n\n{text}"
+REDUCE_PROMPT = "下面是同一{kind}各部分的摘要，请合并为一份连贯、去重的中文摘要：\n\n{text}"
+FOCUS_PROMPT = "\n\n摘要请侧重：{focus}"
+
+_CJK = re.compile(r"[　-〿㐀-鿿＀-￯]")
+# 优先在段落、句子边界切分
+_SENTENCES = re.compile(r"[^\n。！？!?]*(?:[\n。！？!?]+|$)")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计 token 数：中文字符按 1 个、其他字符按 4 个字符 1 个计算（偏保守）"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+def chunk_text(text: str, max_tokens: int) -> list:
+    """按句子边界把文本打包为不超过 max_tokens 的块，超长的单句按字符硬切"""
+    chunks, current, size = [], [], 0
+    for sentence in _SENTENCES.findall(text or ""):
+        if not sentence:
+            continue
+        tokens = estimate_tokens(sentence)
+        if tokens > max_tokens:
+            step = max(len(sentence) * max_tokens // tokens, 1)
+            pieces = [sentence[i:i + step] for i in range(0, len(sentence), step)]
+        else:
+            pieces = [sentence]
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if current and size + tokens > max_tokens:
+                chunks.append("".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def chunk_comments(comments: list, max_tokens: int) -> list:
+    """把评论（字符串或含 comment_content/likes_count 的字典）逐条打包为文本块"""
+    lines = []
+    for comment in comments:
+        if isinstance(comment, dict):
+            content = (comment.get("comment_content") or "").strip()
+            if content and comment.get("likes_count"):
+                content = f"[{comment['likes_count']}赞] {content}"
+        else:
+            content = str(comment or "").strip()
+        if content:
+            lines.append(content.replace("\n", " ") + "\n")
+    return chunk_text("".join(lines), max_tokens)
+
+
+class SummaryCache:
+    """按内容哈希缓存摘要，每条一个 JSON 文件，多个进程可以共享"""
+
+    def __init__(self, directory: str = SUMMARY_CACHE_DIR):
+        self.directory = directory
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                value = json.load(f)["summary"]
+        except (OSError, ValueError, KeyError):
+            metrics.inc("cache_misses_total", cache="summary")
+            return None
+        metrics.inc("cache_hits_total", cache="summary")
+        return value
+
+    def put(self, key: str, summary: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "time": time.time()}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+class Summarizer:
+    """map-reduce 摘要：分块并发摘要（最多 concurrency 个 LLM 调用同时进行），再按 fan_in 分组逐层合并"""
+
+    def __init__(self, model: str = SUMMARY_MODEL, concurrency: int = None, chunk_tokens: int = None,
+                 max_tokens: int = 1024, fan_in: int = 8, cache: SummaryCache = None):
+        self.model = model
+        self.chunk_tokens = chunk_tokens or int(os.getenv("SUMMARY_CHUNK_TOKENS", 3000))
+        self.max_tokens = max_tokens
+        self.fan_in = fan_in
+        self.cache = cache or SummaryCache()
+        self._slots = asyncio.Semaphore(concurrency or int(os.getenv("SUMMARY_CONCURRENCY", 4)))
+
+    async def _complete(self, prompt: str) -> str:
+        """调用 LLM，命中缓存时直接返回"""
+        key = self.cache.key(self.model, prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        from litellm import acompletion
+
+        async with self._slots:
+            start = time.perf_counter()
+            with metrics.timer("llm_summary", model=self.model):
+                response = await acompletion(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    api_base=os.getenv("SUMMARY_API_BASE", "https://api.deepseek.com"),
+                    api_key=os.getenv("DEEPSEEK_API_KEY"),
+                    max_tokens=self.max_tokens,
+                )
+        usage = getattr(response, "usage", None)
+        metrics.record_llm_usage(
+            getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0),
+            time.perf_counter() - start, model=self.model,
+        )
+        summary = (response.choices[0].message.content or "").strip()
+        self.cache.put(key, summary)
+        return summary
+
+    async def _map(self, chunks: list, kind: str) -> list:
+        metrics.inc("summary_chunks_total", len(chunks))
+        return await asyncio.gather(*(self._complete(MAP_PROMPT.format(kind=kind, text=chunk)) for chunk in chunks))
+
+    async def _reduce(self, summaries: list, kind: str, focus: str = None) -> str:
+        """每层把摘要按 fan_in 和 token 预算分组并发合并，直到只剩一份；focus 只用于最后一次合并。
+        每组至少两份摘要，保证每层数量至少减半（单份摘要超过预算时也能结束）"""
+        levels = 0
+        while len(summaries) > 1 or (focus and levels == 0):
+            groups, current, size = [], [], 0
+            for summary in summaries:
+                tokens = estimate_tokens(summary)
+                if len(current) >= 2 and (len(current) >= self.fan_in or size + tokens > self.chunk_tokens):
+                    groups.append(current)
+                    current, size = [], 0
+                current.append(summary)
+                size += tokens
+            if len(current) == 1 and groups:
+                # 最后剩下的一份并入上一组，不单独调用一次
+                groups[-1].extend(current)
+            else:
+                groups.append(current)
+            final = len(groups) == 1
+            prompts = [
+                REDUCE_PROMPT.format(kind=kind, text="\n\n".join(group)) + (FOCUS_PROMPT.format(focus=focus) if focus and final else "")
+                for group in groups
+            ]
+            summaries = await asyncio.gather(*(self._complete(prompt) for prompt in prompts))
+            levels += 1
+        metrics.observe("summary_reduce_levels", levels)
+        return summaries[0] if summaries else ""
+
+    async def summarize(self, text: str, kind: str = "文本", focus: str = None) -> dict:
+        """摘要一段长文本"""
+        return await self.summarize_chunks(chunk_text(text, self.chunk_tokens), kind, focus)
+
+    async def summarize_chunks(self, chunks: list, kind: str = "文本", focus: str = None) -> dict:
+        """摘要已分好的块，返回摘要和分块数"""
+        if not chunks:
+            return {"summary": "", "chunks": 0}
+        summaries = await self._map(chunks, kind)
+        return {"summary": await self._reduce(list(summaries), kind, focus), "chunks": len(chunks)}
@@ -1,13 +1,14 @@
 
-from src.sql_agent import SQLAgent
 from src.sql_tools import SQLTools
+from src.metrics import metrics
+from src.session_store import SqliteSessionService
 from google.adk.agents.llm_agent import Agent
 from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
-from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
 from dotenv import load_dotenv
 import os
+import time
 import asyncio
 load_dotenv()
 
@@ -25,12 +26,17 @@ root_agent = Agent(
 )
 
 
-session_service = InMemorySessionService()
+# 会话持久化到本地 SQLite，重启后可继续之前的对话
+session_service = SqliteSessionService()
 
 async def main():
     print("Hello from insight!")
-    session = await session_service.create_session(
-        app_name='SQLTools',
+    session = await session_service.get_session(
+        app_name='sqlTools',
+        user_id='USER_ID',
+        session_id='SESSION_ID',
+    ) or await session_service.create_session(
+        app_name='sqlTools',
         user_id='USER_ID',
         session_id='SESSION_ID',
     )
@@ -53,15 +59,26 @@ async def main():
         # history.append({"user": user_input, "assistant": result})
         
         final_response_text = "No response received"
-        async for event in runner.run_async(user_id='USER_ID', session_id='SESSION_ID', new_message=types.Content(role='user', parts=[types.Part(text=user_input)])):
-            print(f"  [Event] Author: {event.author}, Type: {type(event).__name__}, Final: {event.is_final_response()}, Content: {event.content}")
-            if event.is_final_response():
-                if event.content and event.content.parts:
-                    final_response_text = event.content.parts[0].text
-                elif event.actions and event.actions.escalate:
-                    final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
-                break
+        turn = len(history) + 1
+        input_tokens = output_tokens = 0
+        start = time.perf_counter()
+        with metrics.turn(turn):
+            async for event in runner.run_async(user_id='USER_ID', session_id='SESSION_ID', new_message=types.Content(role='user', parts=[types.Part(text=user_input)])):
+                print(f"  [Event] Author: {event.author}, Type: {type(event).__name__}, Final: {event.is_final_response()}, Content: {event.content}")
+                if event.usage_metadata:
+                    input_tokens += event.usage_metadata.prompt_token_count or 0
+                    output_tokens += event.usage_metadata.candidates_token_count or 0
+                if event.is_final_response():
+                    if event.content and event.content.parts:
+                        final_response_text = event.content.parts[0].text
+                    elif event.actions and event.actions.escalate:
+                        final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
+                    break
+            metrics.record_llm_usage(input_tokens, output_tokens, time.perf_counter() - start, model="deepseek-chat")
+        history.append({"user": user_input, "assistant": final_response_text})
         print(f"<<< Agent Response: {final_response_text}")
+    # 退出时写出指标和时间线
+    metrics.dump(".logs")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,4 +1,3 @@
-from src.sql_agent import SQLAgent
 from src.sql_tools import SQLTools
 from google.adk.agents.llm_agent import Agent
 from google.adk.models.lite_llm import LiteLlm
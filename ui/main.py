@@ -1,13 +1,41 @@
-from tarfile import data_filter
+import os
+import uuid
+import json
+import logging
 import streamlit as st
-import time
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from sse import SSEParser
+
+API_BASE = os.getenv("ADK_API_BASE", "http://localhost:8000")
+APP_NAME = "adkmcp"
+
+logger = logging.getLogger("moreinsight_ui")
+
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """所有浏览器会话共享的 keep-alive 连接池"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_backend_session() -> tuple:
+    """每个浏览器用户在 ADK 后端创建各自的会话"""
+    if "backend_session" not in st.session_state:
+        user_id = f"u-{uuid.uuid4().hex[:12]}"
+        session_id = uuid.uuid4().hex
+        resp = get_http_session().post(f"{API_BASE}/apps/{APP_NAME}/users/{user_id}/sessions/{session_id}", timeout=10)
+        resp.raise_for_status()
+        st.session_state.backend_session = (user_id, session_id)
+    return st.session_state.backend_session
 
 
 if "messages" not in st.session_state:
     st.title("MoreInsight")
-    resp = requests.post("http://localhost:8000/apps/adkmcp/users/u2/sessions/s2")
     st.session_state.messages = []
 
 for message in st.session_state.messages:
@@ -16,10 +44,11 @@ for message in st.session_state.messages:
 
 def agent_process(input: str, ai_response: list):
     print(f"input: {input}")
-    with requests.post("http://localhost:8000/run_sse", json={  
-            "appName": "adkmcp",
-            "userId": "u2",
-            "sessionId": "s2",
+    user_id, session_id = get_backend_session()
+    resp = get_http_session().post(f"{API_BASE}/run_sse", json={
+            "appName": APP_NAME,
+            "userId": user_id,
+            "sessionId": session_id,
             "newMessage": {
                 "role": "user",
                 "parts": [
@@ -29,21 +58,29 @@ def agent_process(input: str, ai_response: list):
                 ]
             },
             "streaming": True
-        }, stream=True) as resp:
+        }, stream=True, timeout=(10, 300))
+    try:
         resp.raise_for_status()
-        for line in resp.iter_lines():
-            if line:
+        parser = SSEParser()
+        for chunk in resp.iter_content(chunk_size=None):
+            for _, data in parser.feed(chunk):
                 try:
-                    decoded_line = line.decode('utf-8')
-                    if decoded_line.startswith("data:"):
-                        data = decoded_line[len("data:"):].strip()
-                        root = json.loads(data)
-                        if root['partial']:
-                            for text in root["content"]["parts"]:
-                                ai_response.append(text["text"])
-                                yield text["text"]
-                except Exception as e:
+                    root = json.loads(data)
+                except json.JSONDecodeError:
+                    logger.warning("无法解析的SSE数据: %s", data[:200])
                     continue
+                if root.get("error"):
+                    yield f"\n\n请求失败: {root['error']}"
+                    return
+                if root.get("partial"):
+                    for part in (root.get("content") or {}).get("parts") or []:
+                        if part.get("text"):
+                            ai_response.append(part["text"])
+                            yield part["text"]
+    finally:
+        # 用户离开页面或重新提问时 Streamlit 会中止脚本并关闭该生成器，
+        # 这里断开流式连接，让 ADK 后端停止继续消耗 LLM 和数据库资源
+        resp.close()
 
 def main():
     if input:=st.chat_input("问吧."):
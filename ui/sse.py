@@ -0,0 +1,60 @@
+import codecs
+
+
+class SSEParser:
+    """增量解析 text/event-stream，支持跨网络分片的半帧、多行 data 和 \\r\\n 换行"""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._data = []
+        self._event = None
+
+    def feed(self, chunk: bytes):
+        """喂入一段原始字节，返回本段中已经完整的事件列表 [(event, data), ...]"""
+        self._buffer += self._decoder.decode(chunk)
+        events = []
+        while True:
+            index = self._next_line_end()
+            if index < 0:
+                break
+            line = self._buffer[:index]
+            # \r\n 视为一个换行
+            skip = 2 if self._buffer.startswith("\r\n", index) else 1
+            self._buffer = self._buffer[index + skip:]
+            event = self._process_line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _next_line_end(self) -> int:
+        positions = [p for p in (self._buffer.find("\n"), self._buffer.find("\r")) if p >= 0]
+        if not positions:
+            return -1
+        index = min(positions)
+        # 末尾单独的 \r 可能是 \r\n 的前半部分，等下一段数据再处理
+        if self._buffer[index] == "\r" and index == len(self._buffer) - 1:
+            return -1
+        return index
+
+    def _process_line(self, line: str):
+        if line == "":
+            # 空行表示一个事件结束
+            if not self._data:
+                self._event = None
+                return None
+            event = (self._event or "message", "\n".join(self._data))
+            self._data = []
+            self._event = None
+            return event
+        if line.startswith(":"):
+            # 注释/心跳
+            return None
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "data":
+            self._data.append(value)
+        elif field == "event":
+            self._event = value
+        return None